@@ -0,0 +1,95 @@
+"""malisc 替身编译器
+
+按 Mali Offline Compiler (Midgard) 的输出格式打印编译结果，数值根据 frag 文件内容确定性地估算，
+用于在没有 malisc.exe 的环境（如 Linux）中测试和压测 ShaderTool 的编译流程。
+
+用法:
+    python fake_malisc.py [-c 核心名] 文件.frag
+
+启用方式: 设置环境变量 SHADERTOOL_COMPILER 或配置项 compiler_script 为本脚本路径。
+环境变量 FAKE_MALISC_DELAY 可指定每次编译的模拟耗时（秒）。
+"""
+import os
+import re
+import sys
+import time
+import zlib
+
+ARITHMETIC_PATTERN = re.compile(r'[-+*/]|\b(?:dot|mix|clamp|pow|exp2|log2|sqrt|inversesqrt|normalize|max|min)\s*\(')
+LOAD_STORE_PATTERN = re.compile(r'\buniform\b|\[[^\]]+\]')
+TEXTURE_PATTERN = re.compile(r'\btexture(?:Lod|Proj|Grad|Offset)?\s*\(')
+
+
+def estimate(source, core):
+    """根据源码粗略估算各管线的指令数和周期数"""
+    arithmetic = len(ARITHMETIC_PATTERN.findall(source))
+    load_store = len(LOAD_STORE_PATTERN.findall(source))
+    texture = len(TEXTURE_PATTERN.findall(source))
+
+    # 不同核心使用不同的缩放系数，便于区分多核心扫描的结果
+    scale = 1.0 + (zlib.crc32(core.encode('utf-8')) % 5) * 0.1
+
+    emitted = (max(arithmetic // 2, 1), max(load_store // 3, 1), texture)
+    longest = (round(emitted[0] * 0.5 * scale, 1), float(emitted[1]), float(texture))
+    shortest = (round(longest[0] * 0.6, 1), float(emitted[1]), float(texture))
+    work_registers = min(4 + arithmetic // 8, 64)
+    uniform_registers = min(load_store, 64)
+    return emitted, shortest, longest, work_registers, uniform_registers
+
+
+def bound_of(values):
+    names = ("A", "L/S", "T")
+    peak = max(values)
+    return ", ".join(name for name, value in zip(names, values) if value == peak)
+
+
+def format_number(value):
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def main(argv):
+    core = "Mali-T880"
+    paths = []
+    i = 0
+    while i < len(argv):
+        if argv[i] in ("-c", "--core") and i + 1 < len(argv):
+            core = argv[i + 1]
+            i += 2
+            continue
+        paths.append(argv[i])
+        i += 1
+
+    if not paths:
+        print("Usage: fake_malisc.py [-c core] <shader>", file=sys.stderr)
+        return 1
+
+    delay = float(os.environ.get("FAKE_MALISC_DELAY", "0") or 0)
+    if delay > 0:
+        time.sleep(delay)
+
+    with open(paths[-1], 'r', encoding='utf-8', errors='replace') as f:
+        source = f.read()
+
+    emitted, shortest, longest, work_registers, uniform_registers = estimate(source, core)
+
+    print("ARM Mali Offline Compiler v6.4.0 (fake)")
+    print("(C) Copyright 2007-2018 ARM Limited.")
+    print("All rights reserved.")
+    print()
+    print('No driver specified, using "Mali-T600_r23p0-00rel0" as default.')
+    print()
+    print(f'Using core "{core}".')
+    print()
+    print(f"{work_registers} work registers used, {uniform_registers} uniform registers used, spilling not used.")
+    print()
+    print("                        A       L/S     T       Bound")
+    print("Instructions Emitted:   " + "       ".join(str(v) for v in emitted) + f"       {bound_of(emitted)}")
+    print("Shortest Path Cycles:   " + "       ".join(format_number(v) for v in shortest) + f"       {bound_of(shortest)}")
+    print("Longest Path Cycles:    " + "       ".join(format_number(v) for v in longest) + f"       {bound_of(longest)}")
+    print()
+    print("A = Arithmetic, L/S = Load/Store, T = Texture")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,6 +1,31 @@
 import wx
 import os
+import re
 import json
+import sys
+import shutil
+import hashlib
+import threading
+import itertools
+import subprocess
+import queue
+import collections
+import heapq
+import statistics
+import operator
+import tempfile
+import sqlite3
+import time
+import concurrent.futures
+import multiprocessing
+import bisect
+import mmap
+
+# numpy 为可选依赖：安装时统计直接在列数组上计算，未安装时使用纯Python实现
+try:
+    import numpy as np
+except ImportError:
+    np = None
 # import sys
 
 class HelpDialog(wx.Dialog):
@@ -121,9 +146,11 @@ class HelpDialog(wx.Dialog):
 
 
 class ProgressDialog(wx.Dialog):
-    """进度对话框"""
-    def __init__(self, parent, title="处理中...", message="正在处理，请稍候..."):
-        super().__init__(parent, title=title, size=(400, 150))
+    """进度对话框（传入 on_cancel 回调时显示取消按钮，并允许通过关闭按钮取消）"""
+    def __init__(self, parent, title="处理中...", message="正在处理，请稍候...", on_cancel=None):
+        super().__init__(parent, title=title, size=(400, 180 if on_cancel else 150))
+        
+        self.on_cancel = on_cancel
         
         # 设置对话框样式
         self.SetExtraStyle(wx.DIALOG_EX_CONTEXTHELP)
@@ -148,6 +175,14 @@ class ProgressDialog(wx.Dialog):
         self.progress_label.SetFont(wx.Font(9, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL))
         vbox.Add(self.progress_label, flag=wx.ALIGN_CENTER | wx.TOP, border=5)
         
+        # 添加取消按钮（仅可取消的任务）
+        self.cancel_btn = None
+        if on_cancel:
+            self.cancel_btn = wx.Button(panel, label="取消")
+            self.cancel_btn.Bind(wx.EVT_BUTTON, self.on_cancel_button)
+            self.cancel_btn.SetBackgroundColour(wx.Colour(245, 95, 90))
+            vbox.Add(self.cancel_btn, flag=wx.ALIGN_CENTER | wx.TOP, border=8)
+        
         # 设置面板布局
         panel.SetSizer(vbox)
         
@@ -157,8 +192,9 @@ class ProgressDialog(wx.Dialog):
         # 绑定关闭事件
         self.Bind(wx.EVT_CLOSE, self.on_close)
         
-        # 禁用对话框的关闭按钮（防止用户手动关闭）
-        self.SetWindowStyleFlag(self.GetWindowStyleFlag() & ~wx.CLOSE_BOX)
+        if not on_cancel:
+            # 禁用对话框的关闭按钮（防止用户手动关闭）
+            self.SetWindowStyleFlag(self.GetWindowStyleFlag() & ~wx.CLOSE_BOX)
     
     def update_progress(self, current, total, message=None):
         """更新进度"""
@@ -179,9 +215,17 @@ class ProgressDialog(wx.Dialog):
         self.Refresh()
     
     def on_close(self, event):
-        """处理关闭事件 - 阻止用户手动关闭"""
-        # 不执行任何操作，阻止关闭
-        pass
+        """处理关闭事件 - 不直接关闭，可取消的任务转为取消操作"""
+        # 对话框由任务结束时的 close_dialog 关闭
+        if self.on_cancel:
+            self.on_cancel_button(event)
+    
+    def on_cancel_button(self, event):
+        """处理取消按钮：通知任务取消，等待任务保存已完成的结果后关闭对话框"""
+        if self.cancel_btn and self.cancel_btn.IsEnabled():
+            self.cancel_btn.Disable()
+            self.message_label.SetLabel("正在取消，终止进行中的编译...")
+            self.on_cancel()
     
     def close_dialog(self):
         """安全关闭对话框"""
@@ -191,17 +235,668 @@ class ProgressDialog(wx.Dialog):
         self.Destroy()
 
 
+class MaliscMetrics:
+    """一次malisc编译输出解析得到的结构化指标
+    *_cycles / instructions 为按管线顺序排列的数值元组（管线名见 pipelines），*_bound 为瓶颈管线
+    variant_cycles 为输出分成多个变体（IDVS 顶点着色器的 Position / Varying）时各变体的复杂度 {变体名: 复杂度}
+    未出现在输出中的字段为 None
+    """
+    __slots__ = ("compiler_version", "pipelines", "instructions", "instructions_bound",
+                 "shortest_cycles", "shortest_bound", "longest_cycles", "longest_bound",
+                 "total_cycles", "total_bound", "work_registers", "uniform_registers",
+                 "spilling", "fp16_arithmetic", "variant_cycles")
+    # 输出中没有管线表头时使用的管线名（Midgard）
+    DEFAULT_PIPELINES = ("A", "L/S", "T")
+    
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, None)
+    
+    @property
+    def pipeline_cycles(self):
+        """Longest Path Cycles 按管线拆分的周期数 {管线名: 周期数}"""
+        if self.longest_cycles is None:
+            return None
+        return dict(zip(self.pipelines or self.DEFAULT_PIPELINES, self.longest_cycles))
+    
+    @property
+    def bound_unit(self):
+        """限制吞吐的瓶颈管线分类，例如 "A"、"L/S"、"A+L/S"（多个管线周期数相同）
+        优先使用 malisc 输出的 Bound 列，没有时取 Longest Path Cycles 中周期数最大的管线
+        """
+        if self.longest_bound:
+            return "+".join(unit.strip() for unit in self.longest_bound.split(","))
+        cycles = self.pipeline_cycles
+        if not cycles:
+            return None
+        peak = max(cycles.values())
+        if peak <= 0:
+            return None
+        return "+".join(name for name, value in cycles.items() if value == peak)
+    
+    @property
+    def cycles_sum(self):
+        """Longest Path Cycles 前三个值的和（界面上显示的"复杂度"）"""
+        if self.longest_cycles is None or len(self.longest_cycles) < 3:
+            return None
+        return self.longest_cycles[0] + self.longest_cycles[1] + self.longest_cycles[2]
+    
+    @property
+    def stage_cycles_sum(self):
+        """整个着色阶段的复杂度：输出分成多个变体时为各变体复杂度之和
+        （Bifrost/Valhall 的 IDVS 顶点着色器 = Position + Varying），否则与 cycles_sum 相同
+        """
+        if self.variant_cycles:
+            # 输出中的数值只有两位小数，求和后去掉浮点误差
+            return round(sum(self.variant_cycles.values()), 2)
+        return self.cycles_sum
+    
+    @property
+    def instructions_emitted(self):
+        """Instructions Emitted 的第一个值"""
+        if not self.instructions:
+            return None
+        return int(self.instructions[0])
+    
+    def to_dict(self):
+        """转换为可写入JSON的字典"""
+        return {name: list(value) if isinstance(value, tuple) else value
+                for name in self.__slots__
+                for value in (getattr(self, name),)}
+    
+    @classmethod
+    def from_dict(cls, data):
+        """从 to_dict 的结果恢复"""
+        metrics = cls()
+        for name in cls.__slots__:
+            value = data.get(name)
+            setattr(metrics, name, tuple(value) if isinstance(value, list) else value)
+        return metrics
+
+
+class MaliscOutputParser:
+    """malisc 输出的单遍解析器：逐行 feed，结束后从 metrics 读取结果
+    同时支持 Midgard（"Longest Path Cycles:"、"N work registers used, ..."）
+    和 Valhall/Bifrost（"Longest path cycles:"、"Work registers: N"）两种格式
+    """
+    NUMBER_PATTERN = re.compile(r'\d+\.?\d*')
+    ROW_PATTERN = re.compile(
+        r'(Instructions Emitted|Shortest Path Cycles|Longest Path Cycles|Total Instruction Cycles):(.*)',
+        re.IGNORECASE
+    )
+    HEADER_PATTERN = re.compile(r'^\s+([A-Z][A-Z/]*(?:\s+[A-Z][A-Z/]*)*)\s+Bound\s*$')
+    # IDVS 顶点着色器输出中的变体标题，例如 "Position variant"、"Varying variant"
+    VARIANT_PATTERN = re.compile(r'^\s*(\w+) variant\s*$')
+    MIDGARD_REGISTERS_PATTERN = re.compile(
+        r'(\d+) work registers used, (\d+) uniform registers used, spilling (not )?used'
+    )
+    REGISTER_PATTERN = re.compile(r'^\s*(Work|Uniform) registers:\s*(\d+)', re.IGNORECASE)
+    SPILLING_PATTERN = re.compile(r'^\s*Stack spilling:\s*(\S+)', re.IGNORECASE)
+    FP16_PATTERN = re.compile(r'^\s*16-bit arithmetic:\s*(\d+)', re.IGNORECASE)
+    VERSION_PATTERN = re.compile(r'Offline Compiler v(\S+)')
+    # parse 用来定位可能相关的行，与 feed 中的子串判断保持一致
+    LINE_KEYWORDS = ("ycles:", "mitted:", "egisters", "pilling", "arithmetic:", "Compiler v", "Bound", " variant")
+    
+    # 行名称 -> (数值字段, 瓶颈字段)
+    ROW_FIELDS = {
+        "instructions emitted": ("instructions", "instructions_bound"),
+        "shortest path cycles": ("shortest_cycles", "shortest_bound"),
+        "longest path cycles": ("longest_cycles", "longest_bound"),
+        "total instruction cycles": ("total_cycles", "total_bound"),
+    }
+    
+    def __init__(self):
+        self.metrics = MaliscMetrics()
+        # 当前所在的变体（IDVS 输出），没有变体标题时为 None
+        self.variant = None
+    
+    @classmethod
+    def parse(cls, output):
+        """解析完整的输出文本，返回 MaliscMetrics
+        先用 str.find 在整段文本上定位包含关键字的行，只把这些行交给 feed，
+        大量无关的输出行（例如 verbose 模式）不会逐行进入Python代码
+        """
+        line_starts = set()
+        for keyword in cls.LINE_KEYWORDS:
+            index = output.find(keyword)
+            while index != -1:
+                line_starts.add(output.rfind('\n', 0, index) + 1)
+                # 同一行只记录一次，从下一行继续查找
+                index = output.find('\n', index)
+                if index == -1:
+                    break
+                index = output.find(keyword, index)
+        
+        parser = cls()
+        for line_start in sorted(line_starts):
+            line_end = output.find('\n', line_start)
+            if line_end == -1:
+                line_end = len(output)
+            parser.feed(output[line_start:line_end].rstrip('\r'))
+        return parser.metrics
+    
+    @property
+    def has_key_fields(self):
+        """界面需要的复杂度和指令数是否都已解析出来"""
+        return self.metrics.longest_cycles is not None and self.metrics.instructions is not None
+    
+    def feed(self, line):
+        """解析一行输出（先用子串判断分类，只有可能相关的行才执行正则）"""
+        metrics = self.metrics
+        
+        if "ycles:" in line or "mitted:" in line:
+            match = self.ROW_PATTERN.search(line)
+            if match:
+                value_field, bound_field = self.ROW_FIELDS[match.group(1).lower()]
+                if value_field == "longest_cycles" and self.variant is not None:
+                    # 每个变体的 Longest Path Cycles 前三个值之和（与 cycles_sum 的定义一致）
+                    values = [float(n.group()) for n in self.NUMBER_PATTERN.finditer(match.group(2))]
+                    if len(values) >= 3:
+                        if metrics.variant_cycles is None:
+                            metrics.variant_cycles = {}
+                        metrics.variant_cycles.setdefault(self.variant, sum(values[:3]))
+                if getattr(metrics, value_field) is None:
+                    values_str = match.group(2)
+                    numbers = list(self.NUMBER_PATTERN.finditer(values_str))
+                    if numbers:
+                        setattr(metrics, value_field, tuple(float(n.group()) for n in numbers))
+                        # 数值之后的文本为瓶颈管线，例如 "A" 或 "A, L/S"
+                        bound = values_str[numbers[-1].end():].strip()
+                        setattr(metrics, bound_field, bound or None)
+        elif "egisters" in line:
+            match = self.MIDGARD_REGISTERS_PATTERN.search(line)
+            if match:
+                metrics.work_registers = int(match.group(1))
+                metrics.uniform_registers = int(match.group(2))
+                metrics.spilling = match.group(3) is None
+                return
+            match = self.REGISTER_PATTERN.match(line)
+            if match:
+                if match.group(1).lower() == "work":
+                    metrics.work_registers = int(match.group(2))
+                else:
+                    metrics.uniform_registers = int(match.group(2))
+        elif "pilling" in line:
+            match = self.SPILLING_PATTERN.match(line)
+            if match:
+                metrics.spilling = match.group(1).lower() not in ("false", "0")
+        elif "arithmetic:" in line:
+            match = self.FP16_PATTERN.match(line)
+            if match:
+                metrics.fp16_arithmetic = int(match.group(1))
+        elif "Compiler v" in line:
+            match = self.VERSION_PATTERN.search(line)
+            if match and metrics.compiler_version is None:
+                metrics.compiler_version = match.group(1)
+        elif " variant" in line:
+            match = self.VARIANT_PATTERN.match(line)
+            if match:
+                self.variant = match.group(1)
+        elif metrics.pipelines is None and line.rstrip().endswith("Bound"):
+            match = self.HEADER_PATTERN.match(line)
+            if match:
+                metrics.pipelines = tuple(match.group(1).split())
+
+
+class VariantMetrics:
+    """单个frag变体的指标记录（列表中的一行），未编译时各指标为 None
+    vertex_* 为配对的顶点程序（同编号的 .vert）的指标，keywords 为分离时记录的变体关键字
+    """
+    __slots__ = ("name", "path", "cycles_sum", "instructions", "work_registers",
+                 "uniform_registers", "bound", "pipeline_cycles", "spilling",
+                 "vertex_cycles_sum", "vertex_instructions", "keywords")
+    
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.cycles_sum = None
+        self.instructions = None
+        self.work_registers = None
+        self.uniform_registers = None
+        self.bound = None
+        self.pipeline_cycles = None
+        self.spilling = None
+        self.vertex_cycles_sum = None
+        self.vertex_instructions = None
+        self.keywords = ()
+    
+    @property
+    def has_metrics(self):
+        """复杂度和指令数是否都已知"""
+        return self.cycles_sum is not None and self.instructions is not None
+    
+    def update_from_entry(self, entry):
+        """用 compile_frag 返回的结果更新指标，编译失败时保持原值"""
+        if entry["returncode"] != 0 or entry["cycles_sum"] is None:
+            return False
+        self.cycles_sum = entry["cycles_sum"]
+        self.instructions = entry["instructions"]
+        metrics = entry.get("metrics")
+        if metrics:
+            parsed = MaliscMetrics.from_dict(metrics)
+            self.work_registers = parsed.work_registers
+            self.uniform_registers = parsed.uniform_registers
+            self.bound = parsed.bound_unit
+            self.pipeline_cycles = parsed.pipeline_cycles
+            self.spilling = parsed.spilling
+        return True
+    
+    def update_vertex_from_entry(self, entry):
+        """用配对的顶点程序的编译结果更新顶点指标，编译失败时保持原值
+        顶点复杂度为整个顶点阶段的复杂度（IDVS 为 Position 与 Varying 之和，见 MaliscMetrics.stage_cycles_sum）
+        """
+        vertex_cycles_sum = MaliscMetrics.from_dict(entry.get("metrics") or {}).stage_cycles_sum
+        if entry["returncode"] != 0 or vertex_cycles_sum is None:
+            return False
+        self.vertex_cycles_sum = vertex_cycles_sum
+        self.vertex_instructions = entry["instructions"]
+        return True
+
+
+class MetricStore:
+    """变体指标存储：以变体路径为键，O(1) 查找和更新"""
+    
+    def __init__(self):
+        self._records = {}
+    
+    def __len__(self):
+        return len(self._records)
+    
+    def __contains__(self, path):
+        return path in self._records
+    
+    def get(self, path):
+        """返回路径对应的记录，不存在时返回 None"""
+        return self._records.get(path)
+    
+    def get_or_create(self, name, path):
+        """返回路径对应的记录，不存在时创建一条空记录"""
+        record = self._records.get(path)
+        if record is None:
+            record = VariantMetrics(name, path)
+            self._records[path] = record
+        return record
+    
+    def records(self):
+        """返回所有记录"""
+        return list(self._records.values())
+    
+    def clear(self):
+        """清空所有记录"""
+        self._records.clear()
+
+
+class HotListTracker:
+    """批量分析的热点统计：随结果到达增量维护各指标最差的 K 个变体，以及每个shader的复杂度汇总
+    top-K 使用大小为 K 的最小堆，每个结果 O(log K)；shader 汇总增量维护数量/最小/最大值，
+    中位数在查询时计算；瓶颈分布按shader累计各瓶颈分类的变体数和各管线的周期数之和
+    """
+    METRICS = ("cycles_sum", "instructions")
+    VARIANT_NAME_PATTERN = re.compile(r'^(.*)_\d+\.frag$', re.IGNORECASE)
+    
+    def __init__(self, k=20):
+        self.k = k
+        self._heaps = {metric: [] for metric in self.METRICS}
+        # 堆中值相同时按加入顺序比较（先加入的排在前面），避免比较变体名
+        self._counter = itertools.count()
+        # {shader名: [数量, 最小值, 最大值, 所有复杂度值]}
+        self._shaders = {}
+        # {shader名: [瓶颈分类计数 Counter, {管线名: 周期数之和}, 有管线数据的变体数]}
+        self._bounds = {}
+    
+    @classmethod
+    def shader_name_of(cls, frag_file):
+        """从变体文件名得到shader名，例如 'Test_001.frag' -> 'Test'"""
+        match = cls.VARIANT_NAME_PATTERN.match(os.path.basename(frag_file))
+        return match.group(1) if match else os.path.splitext(os.path.basename(frag_file))[0]
+    
+    def add(self, frag_file, cycles_sum, instructions, bound=None, pipeline_cycles=None):
+        """加入一个变体的结果，值为 None 的指标不参与统计"""
+        for metric, value in (("cycles_sum", cycles_sum), ("instructions", instructions)):
+            if value is None:
+                continue
+            heap = self._heaps[metric]
+            item = (value, -next(self._counter), frag_file)
+            if len(heap) < self.k:
+                heapq.heappush(heap, item)
+            elif value > heap[0][0]:
+                heapq.heapreplace(heap, item)
+        
+        if cycles_sum is not None:
+            shader_name = self.shader_name_of(frag_file)
+            summary = self._shaders.get(shader_name)
+            if summary is None:
+                self._shaders[shader_name] = [1, cycles_sum, cycles_sum, [cycles_sum]]
+            else:
+                summary[0] += 1
+                summary[1] = min(summary[1], cycles_sum)
+                summary[2] = max(summary[2], cycles_sum)
+                summary[3].append(cycles_sum)
+        
+        if bound is not None or pipeline_cycles:
+            shader_name = self.shader_name_of(frag_file)
+            bounds = self._bounds.get(shader_name)
+            if bounds is None:
+                bounds = self._bounds[shader_name] = [collections.Counter(), {}, 0]
+            if bound is not None:
+                bounds[0][bound] += 1
+            if pipeline_cycles:
+                totals = bounds[1]
+                for pipeline, cycles in pipeline_cycles.items():
+                    totals[pipeline] = totals.get(pipeline, 0) + cycles
+                bounds[2] += 1
+    
+    def top(self, metric):
+        """返回指定指标最差的 K 个变体 [(值, 变体名), ...]，从高到低排列"""
+        return [(value, frag_file) for value, _, frag_file in sorted(self._heaps[metric], reverse=True)]
+    
+    def worst(self, metric):
+        """返回指定指标最差的 (值, 变体名)，没有结果时返回 None"""
+        heap = self._heaps[metric]
+        if not heap:
+            return None
+        value, _, frag_file = max(heap)
+        return value, frag_file
+    
+    def shader_summaries(self):
+        """返回每个shader的汇总 [(shader名, 变体数, 最小值, 中位数, 最大值), ...]，按最大值从高到低排列"""
+        rows = [(shader_name, count, minimum, statistics.median(values), maximum)
+                for shader_name, (count, minimum, maximum, values) in self._shaders.items()]
+        rows.sort(key=lambda row: row[4], reverse=True)
+        return rows
+    
+    @staticmethod
+    def _average_cycles(totals, count):
+        """{管线名: 周期数之和} -> {管线名: 平均周期数}"""
+        return {pipeline: total / count for pipeline, total in totals.items()} if count else {}
+    
+    def bound_summaries(self):
+        """返回每个shader的瓶颈分布 [(shader名, 瓶颈分类计数 Counter, {管线名: 平均周期数}), ...]，
+        按变体数从多到少排列
+        """
+        rows = [(shader_name, counter, self._average_cycles(totals, count))
+                for shader_name, (counter, totals, count) in self._bounds.items()]
+        rows.sort(key=lambda row: sum(row[1].values()), reverse=True)
+        return rows
+    
+    def project_bounds(self):
+        """返回整个项目（本次批量分析）的瓶颈分布 (瓶颈分类计数 Counter, {管线名: 平均周期数})"""
+        counter = collections.Counter()
+        totals = {}
+        count = 0
+        for shader_counter, shader_totals, shader_count in self._bounds.values():
+            counter.update(shader_counter)
+            for pipeline, total in shader_totals.items():
+                totals[pipeline] = totals.get(pipeline, 0) + total
+            count += shader_count
+        return counter, self._average_cycles(totals, count)
+
+
+class HotListDialog(wx.Dialog):
+    """热点列表对话框（非模态）：最高复杂度/最高指令数的前 K 个变体，以及按shader的汇总"""
+    def __init__(self, parent, tracker):
+        super().__init__(parent, title="热点列表", size=(760, 480),
+                         style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        
+        notebook = wx.Notebook(self)
+        
+        cycles_list = self.create_list(notebook, [("#", 40), ("变体", 320), ("复杂度", 100)])
+        for row, (value, frag_file) in enumerate(tracker.top("cycles_sum")):
+            self.add_row(cycles_list, row, [str(row + 1), frag_file, self.format_number(value)], value)
+        notebook.AddPage(cycles_list, f"最高复杂度 (前{tracker.k})")
+        
+        instructions_list = self.create_list(notebook, [("#", 40), ("变体", 320), ("指令数", 100)])
+        for row, (value, frag_file) in enumerate(tracker.top("instructions")):
+            self.add_row(instructions_list, row, [str(row + 1), frag_file, self.format_number(value)])
+        notebook.AddPage(instructions_list, f"最高指令数 (前{tracker.k})")
+        
+        shader_list = self.create_list(notebook, [("shader", 220), ("变体数", 60), ("最小", 70),
+                                                  ("中位数", 70), ("最大", 70)])
+        for row, (shader_name, count, minimum, median, maximum) in enumerate(tracker.shader_summaries()):
+            self.add_row(shader_list, row, [shader_name, str(count), self.format_number(minimum),
+                                            self.format_number(median), self.format_number(maximum)], maximum)
+        notebook.AddPage(shader_list, "按shader汇总")
+        
+        bound_list = self.create_list(notebook, [("shader", 160), ("变体数", 60), ("主要瓶颈", 110),
+                                                 ("瓶颈分类", 160), ("平均周期", 220)])
+        project_counter, project_averages = tracker.project_bounds()
+        bound_rows = [("(整个项目)", project_counter, project_averages)] + tracker.bound_summaries()
+        for row, (shader_name, counter, averages) in enumerate(bound_rows):
+            count = sum(counter.values())
+            if counter:
+                dominant, dominant_count = counter.most_common(1)[0]
+                dominant_text = f"{dominant} ({dominant_count * 100 // count}%)"
+            else:
+                dominant_text = ""
+            self.add_row(bound_list, row, [
+                shader_name, str(count), dominant_text,
+                " ".join(f"{bound}:{n}" for bound, n in counter.most_common()),
+                " / ".join(f"{pipeline} {self.format_number(value)}" for pipeline, value in averages.items()),
+            ])
+        notebook.AddPage(bound_list, "瓶颈分布")
+        
+        close_btn = wx.Button(self, label="关闭")
+        close_btn.Bind(wx.EVT_BUTTON, self.on_close)
+        close_btn.SetBackgroundColour(wx.Colour(245, 95, 90))
+        
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(notebook, proportion=1, flag=wx.EXPAND | wx.ALL, border=10)
+        sizer.Add(close_btn, flag=wx.ALIGN_RIGHT | wx.RIGHT | wx.BOTTOM, border=10)
+        self.SetSizer(sizer)
+        
+        self.Centre()
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+    
+    @staticmethod
+    def create_list(parent, columns):
+        list_ctrl = wx.ListCtrl(parent, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
+        for i, (label, width) in enumerate(columns):
+            list_ctrl.InsertColumn(i, label, width=width)
+        return list_ctrl
+    
+    @staticmethod
+    def add_row(list_ctrl, row, values, cycles_sum=None):
+        """添加一行，cycles_sum 不为空时按复杂度设置颜色"""
+        list_ctrl.InsertItem(row, values[0])
+        for col, value in enumerate(values[1:], start=1):
+            list_ctrl.SetItem(row, col, value)
+        if cycles_sum is not None:
+            if cycles_sum <= 40:
+                color = wx.Colour(0, 180, 0)  # 绿色
+            elif cycles_sum <= 79:
+                color = wx.Colour(255, 140, 0)  # 橙色
+            else:
+                color = wx.Colour(220, 0, 0)  # 红色
+            list_ctrl.SetItemTextColour(row, color)
+    
+    @staticmethod
+    def format_number(value):
+        """整数值不显示小数点，其他保留两位小数以内"""
+        if float(value).is_integer():
+            return str(int(value))
+        return str(round(value, 2))
+    
+    def on_close(self, event):
+        """处理关闭事件"""
+        self.Destroy()
+
+
+class VariantListCtrl(wx.ListCtrl):
+    """frag变体列表（虚拟列表）：只保存记录引用，行内容在绘制时从 VariantMetrics 生成
+    点击列标题按该列排序，再次点击切换升序/降序；没有指标的变体总是排在最后
+    设置关键字筛选后只显示包含所有指定关键字的变体
+    """
+    # (列标题, 列宽, 排序使用的 VariantMetrics 字段)
+    COLUMNS = (
+        ("变体", 260, "name"),
+        ("复杂度", 70, "cycles_sum"),
+        ("指令数", 70, "instructions"),
+        ("顶点", 70, "vertex_cycles_sum"),
+        ("寄存器", 70, "work_registers"),
+        ("瓶颈", 70, "bound"),
+        ("关键字", 240, "keywords"),
+    )
+    
+    def __init__(self, parent):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL)
+        for col, (label, width, _) in enumerate(self.COLUMNS):
+            self.InsertColumn(col, label, width=width)
+        
+        # 所有记录和筛选后显示的记录
+        self.all_records = []
+        self.records = []
+        self.keyword_filter = ()
+        # {变体路径: 行号}，排序后重建
+        self.row_index = {}
+        self.sort_column = None
+        self.sort_ascending = True
+        
+        # 按复杂度分级的行颜色（与其他界面的颜色一致）
+        self.attr_good = wx.ItemAttr()
+        self.attr_good.SetTextColour(wx.Colour(0, 180, 0))  # 绿色
+        self.attr_medium = wx.ItemAttr()
+        self.attr_medium.SetTextColour(wx.Colour(255, 140, 0))  # 橙色
+        self.attr_bad = wx.ItemAttr()
+        self.attr_bad.SetTextColour(wx.Colour(220, 0, 0))  # 红色
+        
+        self.Bind(wx.EVT_LIST_COL_CLICK, self.on_col_click)
+    
+    def set_records(self, records):
+        """替换列表中的所有记录（保持当前的排序方式和关键字筛选）"""
+        self.all_records = list(records)
+        self.apply_filter()
+    
+    def set_keyword_filter(self, keywords):
+        """只显示包含所有指定关键字的变体，keywords 为空时显示全部"""
+        self.keyword_filter = tuple(keywords)
+        self.apply_filter()
+    
+    def apply_filter(self):
+        """按关键字筛选记录并重建列表"""
+        if self.keyword_filter:
+            self.records = [record for record in self.all_records
+                            if all(keyword in record.keywords for keyword in self.keyword_filter)]
+        else:
+            self.records = list(self.all_records)
+        if self.sort_column is not None:
+            self.sort_records()
+        self.rebuild_row_index()
+        self.DeleteAllItems()
+        self.SetItemCount(len(self.records))
+        self.Refresh()
+    
+    def get_record(self, row):
+        """返回指定行的记录"""
+        return self.records[row]
+    
+    def get_selected_row(self):
+        """返回选中的行号，没有选中项时返回 wx.NOT_FOUND"""
+        return self.GetFirstSelected()
+    
+    def refresh_record(self, path):
+        """记录的指标更新后重绘对应的行（只重绘该行，不重新排序）"""
+        row = self.row_index.get(path)
+        if row is not None:
+            self.RefreshItem(row)
+    
+    def rebuild_row_index(self):
+        self.row_index = {record.path: row for row, record in enumerate(self.records)}
+    
+    def sort_records(self):
+        """按当前排序列排序，值为 None 的记录无论升降序都排在最后"""
+        field = self.COLUMNS[self.sort_column][2]
+        known = []
+        unknown = []
+        for record in self.records:
+            if getattr(record, field) is None:
+                unknown.append(record)
+            else:
+                known.append(record)
+        known.sort(key=operator.attrgetter(field), reverse=not self.sort_ascending)
+        self.records = known + unknown
+    
+    def on_col_click(self, event):
+        """处理列标题点击事件：按该列排序并保持选中项"""
+        col = event.GetColumn()
+        if col < 0:
+            return
+        if col == self.sort_column:
+            self.sort_ascending = not self.sort_ascending
+        else:
+            # 名称默认升序，指标默认降序（最差的在最上面）
+            self.sort_column = col
+            self.sort_ascending = col == 0
+        
+        selected_row = self.get_selected_row()
+        selected = self.records[selected_row] if selected_row != wx.NOT_FOUND else None
+        
+        self.sort_records()
+        self.rebuild_row_index()
+        self.ShowSortIndicator(col, self.sort_ascending)
+        
+        if selected is not None:
+            row = self.row_index[selected.path]
+            self.Select(selected_row, False)
+            self.Select(row)
+            self.EnsureVisible(row)
+        self.Refresh()
+    
+    def OnGetItemText(self, row, col):
+        """虚拟列表回调：生成指定单元格的文本"""
+        record = self.records[row]
+        if col == 0:
+            return record.name
+        if col == 1:
+            return self.format_cycles(record.cycles_sum)
+        if col == 2:
+            return "" if record.instructions is None else str(record.instructions)
+        if col == 3:
+            return self.format_cycles(record.vertex_cycles_sum)
+        if col == 4:
+            if record.work_registers is None:
+                return ""
+            return f"{record.work_registers}/{record.uniform_registers}"
+        if col == 5:
+            return record.bound or ""
+        return " ".join(record.keywords)
+    
+    @staticmethod
+    def format_cycles(cycles_sum):
+        """格式化复杂度值（如果是整数则不显示小数点）"""
+        if cycles_sum is None:
+            return ""
+        if cycles_sum.is_integer():
+            return str(int(cycles_sum))
+        return str(cycles_sum)
+    
+    def OnGetItemAttr(self, row):
+        """虚拟列表回调：按复杂度设置行颜色"""
+        cycles_sum = self.records[row].cycles_sum
+        if cycles_sum is None:
+            return None
+        if cycles_sum <= 40:
+            return self.attr_good
+        if cycles_sum <= 79:
+            return self.attr_medium
+        return self.attr_bad
+
+
 class CompileResultDialog(wx.Dialog):
-    """编译结果对话框（非模态）"""
-    def __init__(self, parent, frag_file_name, output):
-        super().__init__(parent, title=f"编译结果 - {frag_file_name}", size=(800, 550))
+    """编译结果对话框（非模态）
+    report 为 True 时作为只读的统计报告对话框：标题直接使用 frag_file_name，不解析复杂度，
+    文本不自动换行（报告按列对齐）
+    """
+    def __init__(self, parent, frag_file_name, output, report=False):
+        title = frag_file_name if report else f"编译结果 - {frag_file_name}"
+        super().__init__(parent, title=title, size=(800, 550))
         
         # 设置对话框样式，允许同时打开多个
         self.SetExtraStyle(wx.DIALOG_EX_CONTEXTHELP)
         
         # 创建控件
+        wrap_style = wx.TE_DONTWRAP | wx.HSCROLL if report else wx.TE_WORDWRAP
         text_ctrl = wx.TextCtrl(self, value=output, 
-                               style=wx.TE_MULTILINE | wx.TE_READONLY | wx.TE_WORDWRAP | wx.TE_RICH2)
+                               style=wx.TE_MULTILINE | wx.TE_READONLY | wrap_style | wx.TE_RICH2)
         # 设置浅灰色背景
         text_ctrl.SetBackgroundColour(wx.Colour(200, 200, 200))
         # 使用与PowerShell相同的字体，确保显示一致性
@@ -240,8 +935,8 @@ class CompileResultDialog(wx.Dialog):
         copy_btn.Bind(wx.EVT_BUTTON, lambda e: self.copy_to_clipboard(output))
         copy_btn.SetBackgroundColour(wx.Colour(155, 225, 110))
         
-        # 计算Longest Path Cycles三个值的和
-        cycles_sum = self.calculate_longest_path_cycles_sum(output)
+        # 计算Longest Path Cycles三个值的和（统计报告不是编译输出，不显示）
+        cycles_sum = None if report else MaliscOutputParser.parse(output).cycles_sum
         
         # 创建结果显示文本
         result_text = ""
@@ -251,7 +946,7 @@ class CompileResultDialog(wx.Dialog):
                 result_text = f"LongestPathCycles总和: {int(cycles_sum)}"
             else:
                 result_text = f"LongestPathCycles总和: {cycles_sum}"
-        else:
+        elif not report:
             result_text = "LongestPathCycles: --"
         
         result_label = wx.StaticText(self, label=result_text)
@@ -283,84 +978,1583 @@ class CompileResultDialog(wx.Dialog):
         # 左侧：结果文本
         bottom_sizer.Add(result_label, proportion=1, flag=wx.ALIGN_CENTER_VERTICAL | wx.LEFT, border=10)
         
-        # 右侧：按钮
-        btn_sizer = wx.BoxSizer(wx.HORIZONTAL)
-        btn_sizer.Add(copy_btn, flag=wx.ALIGN_CENTER | wx.RIGHT, border=10)
-        btn_sizer.Add(self.close_btn, flag=wx.ALIGN_CENTER)
-        bottom_sizer.Add(btn_sizer, flag=wx.ALIGN_CENTER | wx.RIGHT, border=10)
+        # 右侧：按钮
+        btn_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        btn_sizer.Add(copy_btn, flag=wx.ALIGN_CENTER | wx.RIGHT, border=10)
+        btn_sizer.Add(self.close_btn, flag=wx.ALIGN_CENTER)
+        bottom_sizer.Add(btn_sizer, flag=wx.ALIGN_CENTER | wx.RIGHT, border=10)
+        
+        sizer.Add(bottom_sizer, flag=wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, border=10)
+        self.SetSizer(sizer)
+        
+        # 居中显示
+        self.Centre()
+        
+        # 绑定关闭事件
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+        
+        # 设置默认按钮为关闭按钮
+        self.close_btn.SetDefault()
+        
+        # 在对话框显示后将焦点设置到关闭按钮
+        self.Bind(wx.EVT_SHOW, self.on_show)
+    
+    def on_show(self, event):
+        """处理对话框显示事件：将焦点设置到关闭按钮"""
+        if event.IsShown():
+            # 延迟设置焦点，确保对话框完全显示
+            wx.CallAfter(self.close_btn.SetFocus)
+        event.Skip()
+    
+    def on_close(self, event):
+        """处理关闭事件"""
+        self.Destroy()
+    
+    @staticmethod
+    def copy_to_clipboard(text):
+        """复制文本到剪贴板"""
+        import wx
+        if wx.TheClipboard.Open():
+            wx.TheClipboard.SetData(wx.TextDataObject(text))
+            wx.TheClipboard.Close()
+            return True
+        return False
+
+
+class CompileCancelled(Exception):
+    """编译任务已被取消"""
+
+
+class CompileCancelToken:
+    """批量编译的取消令牌：记录正在运行的编译器进程，取消时全部终止"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._processes = set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        """标记取消并终止所有进行中的编译器进程（可在任意线程调用）"""
+        self._event.set()
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            try:
+                process.kill()
+            except OSError:
+                pass
+
+    def register(self, process):
+        with self._lock:
+            self._processes.add(process)
+        # 注册前已经取消的情况下立即终止
+        if self.cancelled:
+            try:
+                process.kill()
+            except OSError:
+                pass
+
+    def unregister(self, process):
+        with self._lock:
+            self._processes.discard(process)
+
+
+class CompileScheduler:
+    """共享的编译任务调度器：固定数量的工作线程按优先级从队列中取任务执行
+
+    数值越小优先级越高：单个变体的交互查看会排在后台批量任务之前执行，
+    所有编译都复用同一组工作线程，不再为每次点击单独创建线程。
+    """
+    PRIORITY_INTERACTIVE = 0
+    PRIORITY_BATCH = 10
+    PRIORITY_PREFETCH = 20
+
+    def __init__(self, workers):
+        self.workers = max(1, workers)
+        self._queue = queue.PriorityQueue()
+        # 相同优先级按提交顺序执行
+        self._counter = itertools.count()
+        self._threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"compile-worker-{i}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, fn, *args, priority=PRIORITY_BATCH):
+        """提交任务，返回 concurrent.futures.Future（排队中的任务可以通过 future.cancel() 取消）"""
+        future = concurrent.futures.Future()
+        self._queue.put((priority, next(self._counter), future, fn, args))
+        return future
+
+    def _worker_loop(self):
+        while True:
+            _, _, future, fn, args = self._queue.get()
+            try:
+                # 已取消的任务直接跳过
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(fn(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+
+class CoreSweepResultDialog(wx.Dialog):
+    """多核扫描结果对话框（非模态）：每个核心一行，显示该核心下的最坏情况"""
+    def __init__(self, parent, cores, summaries):
+        super().__init__(parent, title="多核扫描结果", size=(760, 360),
+                         style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        
+        self.list_ctrl = wx.ListCtrl(self, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
+        columns = [("核心", 110), ("最高复杂度", 80), ("变体", 200), ("最高指令数", 80), ("变体", 200), ("成功/失败", 80)]
+        for i, (label, width) in enumerate(columns):
+            self.list_ctrl.InsertColumn(i, label, width=width)
+        
+        for row, core in enumerate(cores):
+            summary = summaries[core]
+            max_cycles = summary["max_cycles"]
+            if max_cycles and float(max_cycles).is_integer():
+                cycles_text = str(int(max_cycles))
+            else:
+                cycles_text = str(max_cycles) if max_cycles else "--"
+            
+            self.list_ctrl.InsertItem(row, core)
+            self.list_ctrl.SetItem(row, 1, cycles_text)
+            self.list_ctrl.SetItem(row, 2, summary["max_cycles_frag"])
+            self.list_ctrl.SetItem(row, 3, str(summary["max_instructions"]) if summary["max_instructions"] else "--")
+            self.list_ctrl.SetItem(row, 4, summary["max_instructions_frag"])
+            self.list_ctrl.SetItem(row, 5, f"{summary['ok']}/{summary['failed']}")
+            
+            # 根据最高复杂度设置行颜色
+            if not max_cycles:
+                color = wx.Colour(0, 100, 200)  # 蓝色
+            elif max_cycles <= 40:
+                color = wx.Colour(0, 180, 0)  # 绿色
+            elif max_cycles <= 79:
+                color = wx.Colour(255, 140, 0)  # 橙色
+            else:
+                color = wx.Colour(220, 0, 0)  # 红色
+            self.list_ctrl.SetItemTextColour(row, color)
+        
+        close_btn = wx.Button(self, label="关闭")
+        close_btn.Bind(wx.EVT_BUTTON, self.on_close)
+        close_btn.SetBackgroundColour(wx.Colour(245, 95, 90))
+        
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(self.list_ctrl, proportion=1, flag=wx.EXPAND | wx.ALL, border=10)
+        sizer.Add(close_btn, flag=wx.ALIGN_RIGHT | wx.RIGHT | wx.BOTTOM, border=10)
+        self.SetSizer(sizer)
+        
+        self.Centre()
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+    
+    def on_close(self, event):
+        """处理关闭事件"""
+        self.Destroy()
+
+
+class ResultsDatabase:
+    """分析结果数据库（SQLite）：每次批量分析记录为一个 run，每个变体的指标为一行 results
+    查询只读数据库，不需要重新编译；连接在线程间共享，读写都通过锁串行化
+    is_latest 标记默认编译目标（无额外参数）下每个变体最新的一条结果，跨项目查询只看这些行
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at REAL NOT NULL,
+            project TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            compiler TEXT,
+            args TEXT NOT NULL DEFAULT ''
+        );
+        CREATE TABLE IF NOT EXISTS results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+            project TEXT NOT NULL,
+            shader TEXT NOT NULL,
+            variant TEXT NOT NULL,
+            content_hash TEXT,
+            compiler_version TEXT,
+            created_at REAL NOT NULL,
+            cycles_sum REAL,
+            instructions INTEGER,
+            work_registers INTEGER,
+            uniform_registers INTEGER,
+            bound TEXT,
+            spilling INTEGER,
+            returncode INTEGER,
+            is_latest INTEGER NOT NULL DEFAULT 0,
+            pipeline_cycles TEXT,
+            vertex_cycles_sum REAL,
+            vertex_instructions INTEGER,
+            keywords TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_results_shader ON results(shader);
+        CREATE INDEX IF NOT EXISTS idx_results_variant ON results(project, variant);
+        CREATE INDEX IF NOT EXISTS idx_results_content_hash ON results(content_hash);
+        CREATE INDEX IF NOT EXISTS idx_results_compiler_version ON results(compiler_version);
+        CREATE INDEX IF NOT EXISTS idx_results_created_at ON results(created_at);
+        CREATE INDEX IF NOT EXISTS idx_results_run_cycles ON results(run_id, cycles_sum);
+        CREATE INDEX IF NOT EXISTS idx_results_run_instructions ON results(run_id, instructions);
+        CREATE INDEX IF NOT EXISTS idx_results_latest_cycles ON results(is_latest, cycles_sum);
+        CREATE INDEX IF NOT EXISTS idx_results_latest_instructions ON results(is_latest, instructions);
+        CREATE INDEX IF NOT EXISTS idx_results_run_variant
+            ON results(run_id, variant, content_hash, cycles_sum, instructions);
+        CREATE INDEX IF NOT EXISTS idx_results_run_content_hash
+            ON results(run_id, content_hash, variant, cycles_sum, instructions);
+    """
+    RESULT_COLUMNS = ("shader", "variant", "content_hash", "compiler_version", "created_at",
+                      "cycles_sum", "instructions", "work_registers", "uniform_registers",
+                      "bound", "spilling", "returncode", "pipeline_cycles",
+                      "vertex_cycles_sum", "vertex_instructions", "keywords")
+    # 旧版本数据库中没有的列，打开时补充 (列名, 类型)
+    ADDED_COLUMNS = (("pipeline_cycles", "TEXT"), ("vertex_cycles_sum", "REAL"), ("vertex_instructions", "INTEGER"),
+                     ("keywords", "TEXT"))
+    # 可用于排序和阈值查询的指标列（SQL中直接拼接列名，只允许这些值）
+    METRIC_COLUMNS = ("cycles_sum", "instructions")
+    # 查询返回的列
+    QUERY_COLUMNS = ("results.project, shader, variant, cycles_sum, instructions, vertex_cycles_sum, "
+                     "work_registers, uniform_registers, bound, created_at, keywords")
+    
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.execute("PRAGMA temp_store=MEMORY")
+            self._conn.executescript(self.SCHEMA)
+            existing = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+            for column, column_type in self.ADDED_COLUMNS:
+                if column not in existing:
+                    self._conn.execute(f"ALTER TABLE results ADD COLUMN {column} {column_type}")
+            self._conn.commit()
+    
+    def begin_run(self, project, kind, compiler=None, args=()):
+        """新建一次分析记录，返回 run id"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (started_at, project, kind, compiler, args) VALUES (?, ?, ?, ?, ?)",
+                (time.time(), project, kind, compiler, " ".join(args))
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+    
+    def add_results(self, run_id, project, rows, latest=True):
+        """批量写入一次分析的结果，rows 中每项为按 RESULT_COLUMNS 顺序排列的元组
+        latest 为 True（默认编译目标）时这些结果取代同一项目中同名变体之前的最新结果
+        """
+        placeholders = ", ".join("?" * (len(self.RESULT_COLUMNS) + 3))
+        sql = (f"INSERT INTO results (run_id, project, is_latest, {', '.join(self.RESULT_COLUMNS)}) "
+               f"VALUES ({placeholders})")
+        variant_index = self.RESULT_COLUMNS.index("variant")
+        with self._lock:
+            if latest:
+                self._conn.executemany(
+                    # 指定按变体查找，避免按 is_latest 索引扫描所有最新结果
+                    "UPDATE results INDEXED BY idx_results_variant SET is_latest = 0 "
+                    "WHERE project = ? AND variant = ? AND is_latest = 1",
+                    ((project, row[variant_index]) for row in rows)
+                )
+            self._conn.executemany(sql, ((run_id, project, int(latest)) + tuple(row) for row in rows))
+            self._conn.commit()
+    
+    def list_runs(self, limit=200):
+        """返回最近的分析记录 [(id, started_at, project, kind, args, 变体数), ...]"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT runs.id, started_at, runs.project, kind, args, "
+                "(SELECT COUNT(*) FROM results WHERE results.run_id = runs.id) "
+                "FROM runs ORDER BY runs.id DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+    
+    def _scope(self, run_id, keywords=()):
+        """查询范围：指定的 run，或每个变体最新的一条结果；keywords 不为空时只包括含有所有这些关键字的变体"""
+        if run_id is not None:
+            scope, params = "results.run_id = ?", [run_id]
+        else:
+            scope, params = "results.is_latest = 1", []
+        for keyword in keywords:
+            # keywords 列为空格分隔的关键字，两端补空格后按整个词匹配
+            scope += " AND instr(' ' || results.keywords || ' ', ?) > 0"
+            params.append(f" {keyword} ")
+        return scope, params
+    
+    def worst_variants(self, limit=50, metric="cycles_sum", run_id=None, keywords=()):
+        """返回指标最差的 limit 个变体（行格式见 QUERY_COLUMNS）"""
+        if metric not in self.METRIC_COLUMNS:
+            raise ValueError(f"不支持的指标: {metric}")
+        scope, params = self._scope(run_id, keywords)
+        sql = (f"SELECT {self.QUERY_COLUMNS} FROM results WHERE {scope} AND {metric} IS NOT NULL "
+               f"ORDER BY {metric} DESC LIMIT ?")
+        with self._lock:
+            return self._conn.execute(sql, params + [limit]).fetchall()
+    
+    def variants_above(self, threshold, metric="cycles_sum", run_id=None, limit=-1, keywords=()):
+        """返回指标高于 threshold 的变体（最多 limit 个，-1 表示不限），从高到低排列"""
+        if metric not in self.METRIC_COLUMNS:
+            raise ValueError(f"不支持的指标: {metric}")
+        scope, params = self._scope(run_id, keywords)
+        sql = (f"SELECT {self.QUERY_COLUMNS} FROM results WHERE {scope} AND {metric} > ? "
+               f"ORDER BY {metric} DESC LIMIT ?")
+        with self._lock:
+            return self._conn.execute(sql, params + [threshold, limit]).fetchall()
+    
+    def count_above(self, threshold, metric="cycles_sum", run_id=None, keywords=()):
+        """返回指标高于 threshold 的变体数量（不按关键字筛选时只读索引）"""
+        if metric not in self.METRIC_COLUMNS:
+            raise ValueError(f"不支持的指标: {metric}")
+        scope, params = self._scope(run_id, keywords)
+        sql = f"SELECT COUNT(*) FROM results WHERE {scope} AND {metric} > ?"
+        with self._lock:
+            return self._conn.execute(sql, params + [threshold]).fetchone()[0]
+    
+    def metric_columns(self, run_id=None, keywords=()):
+        """返回查询范围内所有变体的 (复杂度列表, 指令数列表)，供统计使用"""
+        scope, params = self._scope(run_id, keywords)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT cycles_sum, instructions FROM results WHERE {scope} AND cycles_sum IS NOT NULL", params
+            ).fetchall()
+        if not rows:
+            return [], []
+        cycles, instructions = zip(*rows)
+        return list(cycles), [value for value in instructions if value is not None]
+    
+    def bound_summary(self, run_id=None):
+        """按项目和shader统计瓶颈分类
+        返回 [(项目, shader, 瓶颈分类, 变体数, 平均复杂度, 最高复杂度), ...]，按项目、shader、变体数排列
+        """
+        scope, params = self._scope(run_id)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT project, shader, bound, COUNT(*), AVG(cycles_sum), MAX(cycles_sum) FROM results "
+                f"WHERE {scope} AND cycles_sum IS NOT NULL "
+                f"GROUP BY project, shader, bound ORDER BY project, shader, COUNT(*) DESC",
+                params
+            ).fetchall()
+    
+    def keyword_summary(self, run_id=None, keywords=()):
+        """按关键字汇总查询范围内的复杂度（只统计分离时记录了关键字的结果）
+        返回 (变体数, 复杂度合计, [(关键字, 变体数, 复杂度合计, 最高复杂度), ...])，
+        没有关键字的变体记为 "<none>"，按变体数从多到少排列
+        """
+        scope, params = self._scope(run_id, keywords)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT keywords, cycles_sum FROM results "
+                f"WHERE {scope} AND keywords IS NOT NULL AND cycles_sum IS NOT NULL",
+                params
+            ).fetchall()
+        
+        totals = {}
+        for variant_keywords, cycles_sum in rows:
+            for keyword in variant_keywords.split() or ["<none>"]:
+                count, total, maximum = totals.get(keyword, (0, 0.0, cycles_sum))
+                totals[keyword] = (count + 1, total + cycles_sum, max(maximum, cycles_sum))
+        summary = sorted(((keyword,) + values for keyword, values in totals.items()),
+                         key=lambda item: (-item[1], item[0]))
+        return len(rows), sum(cycles_sum for _, cycles_sum in rows), summary
+    
+    def diff_runs(self, base_run_id, run_id, metric="cycles_sum", limit=500):
+        """对比两次分析（基线 base_run_id 与当前 run_id）的指标
+        变体先按名称配对；名称在基线中不存在时按内容哈希配对（变体编号变化的情况）。
+        返回 {"regressions": [...], "improvements": [...], "counts": {...}}，
+        regressions/improvements 为按变化量排序的前 limit 项 (变体, 基线变体, 配对方式, 基线值, 当前值, 变化量)
+        """
+        if metric not in self.METRIC_COLUMNS:
+            raise ValueError(f"不支持的指标: {metric}")
+        with self._lock:
+            conn = self._conn
+            conn.execute("DROP TABLE IF EXISTS temp.diff_pairs")
+            conn.execute(
+                "CREATE TEMP TABLE diff_pairs (variant TEXT, base_variant TEXT, matched_by TEXT, "
+                "base_value REAL, value REAL, delta REAL)"
+            )
+            # 按名称配对：两侧都只读 (run_id, variant, ...) 覆盖索引，按变体名顺序合并
+            conn.execute(
+                f"INSERT INTO diff_pairs "
+                f"SELECT c.variant, b.variant, '同名', b.{metric}, c.{metric}, c.{metric} - b.{metric} "
+                f"FROM results c INDEXED BY idx_results_run_variant "
+                f"JOIN results b INDEXED BY idx_results_run_variant "
+                f"ON b.run_id = ? AND b.variant = c.variant "
+                f"WHERE c.run_id = ? AND c.{metric} IS NOT NULL AND b.{metric} IS NOT NULL",
+                (base_run_id, run_id)
+            )
+            # 名称在基线中不存在时按内容哈希配对
+            # （基线中有多个相同内容的变体时取最早写入的一个，MIN 使其余列取自同一行）
+            conn.execute(
+                f"INSERT INTO diff_pairs "
+                f"SELECT variant, base_variant, '同内容', base_value, value, value - base_value FROM ("
+                f"    SELECT c.variant, b.variant AS base_variant, b.{metric} AS base_value, "
+                f"           c.{metric} AS value, MIN(b.id) "
+                f"    FROM results c INDEXED BY idx_results_run_variant "
+                f"    JOIN results b INDEXED BY idx_results_run_content_hash "
+                f"    ON b.run_id = ? AND b.content_hash = c.content_hash "
+                f"    WHERE c.run_id = ? AND c.{metric} IS NOT NULL AND b.{metric} IS NOT NULL "
+                f"    AND NOT EXISTS (SELECT 1 FROM results WHERE run_id = ? AND variant = c.variant) "
+                f"    GROUP BY c.id)",
+                (base_run_id, run_id, base_run_id)
+            )
+            
+            regressions = conn.execute(
+                "SELECT * FROM diff_pairs WHERE delta > 0 ORDER BY delta DESC LIMIT ?", (limit,)
+            ).fetchall()
+            improvements = conn.execute(
+                "SELECT * FROM diff_pairs WHERE delta < 0 ORDER BY delta ASC LIMIT ?", (limit,)
+            ).fetchall()
+            # 按名称配对的基线变体各不相同，只有按内容配对的需要去重
+            regressed, improved, unchanged, matched_base = conn.execute(
+                "SELECT COALESCE(SUM(delta > 0), 0), COALESCE(SUM(delta < 0), 0), COALESCE(SUM(delta = 0), 0), "
+                "COALESCE(SUM(matched_by = '同名'), 0) "
+                "+ COUNT(DISTINCT CASE WHEN matched_by = '同内容' THEN base_variant END) FROM diff_pairs"
+            ).fetchone()
+            current_total = conn.execute(
+                f"SELECT COUNT(*) FROM results WHERE run_id = ? AND {metric} IS NOT NULL", (run_id,)
+            ).fetchone()[0]
+            base_total = conn.execute(
+                f"SELECT COUNT(*) FROM results WHERE run_id = ? AND {metric} IS NOT NULL", (base_run_id,)
+            ).fetchone()[0]
+            conn.execute("DROP TABLE temp.diff_pairs")
+        
+        return {
+            "regressions": regressions,
+            "improvements": improvements,
+            "counts": {
+                "regressed": regressed,
+                "improved": improved,
+                "unchanged": unchanged,
+                # 当前分析中没有配对的变体为新增，基线中没有被配对的变体为移除
+                "added": current_total - (regressed + improved + unchanged),
+                "removed": base_total - matched_base,
+            },
+        }
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ResultsQueryDialog(wx.Dialog):
+    """结果库查询对话框（非模态）：按最差N个或阈值查询已保存的分析结果"""
+    METRICS = (("复杂度", "cycles_sum"), ("指令数", "instructions"))
+    # 阈值查询最多显示的行数（总数仍然完整统计）
+    MAX_ROWS = 1000
+    
+    def __init__(self, parent, results_db):
+        super().__init__(parent, title="结果库查询", size=(900, 560),
+                         style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.results_db = results_db
+        
+        # 查询范围：每个变体的最新结果，或指定的某次分析
+        self.runs = results_db.list_runs()
+        self.run_labels = []
+        for run_id, started_at, project, kind, args, count in self.runs:
+            started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(started_at))
+            self.run_labels.append(f"#{run_id} {started} {kind} {args} - {project} ({count} 个变体)")
+        self.run_choice = wx.Choice(self, choices=["所有项目（每个变体的最新结果，不含多核扫描）"] + self.run_labels)
+        self.run_choice.SetSelection(0)
+        
+        self.metric_choice = wx.Choice(self, choices=[label for label, _ in self.METRICS])
+        self.metric_choice.SetSelection(0)
+        self.mode_choice = wx.Choice(self, choices=["最差的前N个", "高于阈值"])
+        self.mode_choice.SetSelection(0)
+        self.value_text = wx.TextCtrl(self, value="50", size=(60, -1))
+        # 关键字筛选（空格分隔，变体需包含所有关键字），对查询、分布统计和关键字统计都有效
+        self.keyword_text = wx.TextCtrl(self, size=(180, -1))
+        self.keyword_text.SetHint("关键字筛选，如 _SHADOWS_SOFT")
+        
+        query_btn = wx.Button(self, label="查询")
+        query_btn.Bind(wx.EVT_BUTTON, self.on_query)
+        query_btn.SetBackgroundColour(wx.Colour(155, 225, 110))
+        
+        self.list_ctrl = wx.ListCtrl(self, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
+        columns = [("项目", 180), ("shader", 140), ("变体", 180), ("复杂度", 60), ("指令数", 60),
+                   ("顶点", 60), ("寄存器", 60), ("瓶颈", 60), ("时间", 130), ("关键字", 240)]
+        for i, (label, width) in enumerate(columns):
+            self.list_ctrl.InsertColumn(i, label, width=width)
+        
+        self.info_label = wx.StaticText(self, label="")
+        
+        diff_btn = wx.Button(self, label="对比两次分析")
+        diff_btn.Bind(wx.EVT_BUTTON, self.on_diff)
+        diff_btn.SetBackgroundColour(wx.Colour(173, 216, 230))
+        
+        stats_btn = wx.Button(self, label="分布统计")
+        stats_btn.Bind(wx.EVT_BUTTON, self.on_statistics)
+        stats_btn.SetBackgroundColour(wx.Colour(173, 216, 230))
+        
+        bound_btn = wx.Button(self, label="瓶颈分布")
+        bound_btn.Bind(wx.EVT_BUTTON, self.on_bound_summary)
+        bound_btn.SetBackgroundColour(wx.Colour(173, 216, 230))
+        
+        keyword_btn = wx.Button(self, label="关键字统计")
+        keyword_btn.Bind(wx.EVT_BUTTON, self.on_keyword_summary)
+        keyword_btn.SetBackgroundColour(wx.Colour(173, 216, 230))
+        
+        close_btn = wx.Button(self, label="关闭")
+        close_btn.Bind(wx.EVT_BUTTON, self.on_close)
+        close_btn.SetBackgroundColour(wx.Colour(245, 95, 90))
+        
+        query_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        query_sizer.Add(self.run_choice, proportion=1, flag=wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, border=10)
+        query_sizer.Add(self.metric_choice, flag=wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, border=10)
+        query_sizer.Add(self.mode_choice, flag=wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, border=10)
+        query_sizer.Add(self.value_text, flag=wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, border=10)
+        query_sizer.Add(self.keyword_text, flag=wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, border=10)
+        query_sizer.Add(query_btn, flag=wx.ALIGN_CENTER_VERTICAL)
+        
+        bottom_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        bottom_sizer.Add(self.info_label, proportion=1, flag=wx.ALIGN_CENTER_VERTICAL)
+        bottom_sizer.Add(stats_btn, flag=wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, border=10)
+        bottom_sizer.Add(bound_btn, flag=wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, border=10)
+        bottom_sizer.Add(keyword_btn, flag=wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, border=10)
+        bottom_sizer.Add(diff_btn, flag=wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, border=10)
+        bottom_sizer.Add(close_btn, flag=wx.ALIGN_CENTER_VERTICAL)
+        
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(query_sizer, flag=wx.EXPAND | wx.ALL, border=10)
+        sizer.Add(self.list_ctrl, proportion=1, flag=wx.EXPAND | wx.LEFT | wx.RIGHT, border=10)
+        sizer.Add(bottom_sizer, flag=wx.EXPAND | wx.ALL, border=10)
+        self.SetSizer(sizer)
+        
+        self.Centre()
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+    
+    def selected_run_id(self):
+        """返回选中的 run id，选择"所有项目"时返回 None"""
+        selection = self.run_choice.GetSelection()
+        if selection <= 0:
+            return None
+        return self.runs[selection - 1][0]
+    
+    def selected_keywords(self):
+        """返回关键字筛选框中的关键字（空格分隔）"""
+        return tuple(self.keyword_text.GetValue().split())
+    
+    def on_query(self, event):
+        """执行查询并显示结果"""
+        metric = self.METRICS[self.metric_choice.GetSelection()][1]
+        try:
+            value = float(self.value_text.GetValue())
+        except ValueError:
+            wx.MessageBox("请输入有效的数字", "提示", wx.OK | wx.ICON_WARNING)
+            return
+        
+        start = time.perf_counter()
+        try:
+            if self.mode_choice.GetSelection() == 0:
+                rows = self.results_db.worst_variants(int(value), metric, self.selected_run_id(),
+                                                      self.selected_keywords())
+                total = len(rows)
+            else:
+                total = self.results_db.count_above(value, metric, self.selected_run_id(), self.selected_keywords())
+                rows = self.results_db.variants_above(value, metric, self.selected_run_id(), self.MAX_ROWS,
+                                                      self.selected_keywords())
+        except sqlite3.Error as e:
+            wx.MessageBox(f"查询失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        self.list_ctrl.DeleteAllItems()
+        for row, (project, shader, variant, cycles_sum, instructions, vertex_cycles_sum, work_registers,
+                  uniform_registers, bound, created_at, keywords) in enumerate(rows):
+            self.list_ctrl.InsertItem(row, project)
+            self.list_ctrl.SetItem(row, 1, shader)
+            self.list_ctrl.SetItem(row, 2, variant)
+            self.list_ctrl.SetItem(row, 3, VariantListCtrl.format_cycles(cycles_sum))
+            self.list_ctrl.SetItem(row, 4, "" if instructions is None else str(instructions))
+            self.list_ctrl.SetItem(row, 5, VariantListCtrl.format_cycles(vertex_cycles_sum))
+            if work_registers is not None:
+                self.list_ctrl.SetItem(row, 6, f"{work_registers}/{uniform_registers}")
+            self.list_ctrl.SetItem(row, 7, bound or "")
+            self.list_ctrl.SetItem(row, 8, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created_at)))
+            self.list_ctrl.SetItem(row, 9, keywords or "")
+        
+        if total > len(rows):
+            self.info_label.SetLabel(f"共 {total} 条结果（显示前 {len(rows)} 条），查询耗时 {elapsed_ms:.1f} ms")
+        else:
+            self.info_label.SetLabel(f"共 {total} 条结果，查询耗时 {elapsed_ms:.1f} ms")
+    
+    def on_statistics(self, event):
+        """显示查询范围内所有变体的复杂度和指令数分布"""
+        start = time.perf_counter()
+        try:
+            cycles, instructions = self.results_db.metric_columns(self.selected_run_id(), self.selected_keywords())
+        except sqlite3.Error as e:
+            wx.MessageBox(f"查询失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
+            return
+        report = "\n\n".join([
+            MetricStatistics(cycles).format_report("复杂度 (Longest Path Cycles)"),
+            MetricStatistics(instructions).format_report("指令数 (Instructions Emitted)", with_bands=False),
+        ])
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        engine = "numpy" if np is not None else "Python"
+        scope = self.run_choice.GetStringSelection()
+        if self.selected_keywords():
+            scope += f"，关键字: {' '.join(self.selected_keywords())}"
+        report += f"\n\n（{scope}，{engine} 计算，耗时 {elapsed_ms:.0f} ms）"
+        
+        dlg = CompileResultDialog(self, "分布统计", report, report=True)
+        dlg.Show()
+    
+    def on_bound_summary(self, event):
+        """显示查询范围内按项目和shader的瓶颈分类统计"""
+        try:
+            rows = self.results_db.bound_summary(self.selected_run_id())
+        except sqlite3.Error as e:
+            wx.MessageBox(f"查询失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
+            return
+        
+        lines = []
+        for project, project_rows in itertools.groupby(rows, key=operator.itemgetter(0)):
+            project_rows = list(project_rows)
+            project_counter = collections.Counter()
+            for _, _, bound, count, _, _ in project_rows:
+                project_counter[bound or "未知"] += count
+            total = sum(project_counter.values())
+            lines.append(f"== {project} ({total} 个变体) ==")
+            lines.extend(f"  {bound:<10} {count:>8}  {count * 100 / total:6.2f}%"
+                         for bound, count in project_counter.most_common())
+            lines.append("")
+            for shader, shader_rows in itertools.groupby(project_rows, key=operator.itemgetter(1)):
+                parts = [f"{bound or '未知'}:{count} (平均 {average:.1f}, 最高 {HotListDialog.format_number(maximum)})"
+                         for _, _, bound, count, average, maximum in shader_rows]
+                lines.append(f"  {shader}: " + "  ".join(parts))
+            lines.append("")
+        report = "\n".join(lines) if lines else "没有结果"
+        
+        dlg = CompileResultDialog(self, "瓶颈分布", report, report=True)
+        dlg.Show()
+    
+    def on_keyword_summary(self, event):
+        """显示查询范围内按关键字汇总的复杂度：含有该关键字的变体与其余变体的平均复杂度对比"""
+        keywords = self.selected_keywords()
+        try:
+            count, total, summary = self.results_db.keyword_summary(self.selected_run_id(), keywords)
+        except sqlite3.Error as e:
+            wx.MessageBox(f"查询失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
+            return
+        
+        if not count:
+            report = "没有记录了关键字的结果（需要使用当前版本重新分析）"
+        else:
+            lines = [f"共 {count} 个变体，平均复杂度 {total / count:.1f}"
+                     + (f"（关键字: {' '.join(keywords)}）" if keywords else ""),
+                     "",
+                     # 中文标题每个字占两列，按显示宽度减去字数对齐
+                     f"{'关键字':<29}{'变体数':>5}{'平均':>8}{'最高':>8}{'其余平均':>6}{'差值':>8}"]
+            for keyword, keyword_count, keyword_total, maximum in summary:
+                average = keyword_total / keyword_count
+                if keyword_count < count:
+                    # 不含该关键字的变体的平均复杂度，差值反映该关键字带来的开销
+                    rest_average = (total - keyword_total) / (count - keyword_count)
+                    rest = f"{rest_average:>10.1f}{average - rest_average:>+10.1f}"
+                else:
+                    rest = f"{'--':>10}{'--':>10}"
+                lines.append(f"{keyword:<32}{keyword_count:>8}{average:>10.1f}"
+                             f"{HotListDialog.format_number(maximum):>10}{rest}")
+            report = "\n".join(lines)
+        
+        dlg = CompileResultDialog(self, "关键字统计", report, report=True)
+        dlg.Show()
+    
+    def on_diff(self, event):
+        """打开两次分析的对比对话框"""
+        if len(self.runs) < 2:
+            wx.MessageBox("至少需要两次已保存的分析才能对比", "提示", wx.OK | wx.ICON_INFORMATION)
+            return
+        dlg = RunDiffDialog(self, self.results_db, self.runs, self.run_labels)
+        dlg.Show()
+    
+    def on_close(self, event):
+        """处理关闭事件"""
+        self.Destroy()
+
+
+class MetricStatistics:
+    """一列指标（例如一次分析中所有变体的复杂度）的分布统计：百分位数、直方图和颜色分级占比
+    安装了 numpy 时在数组上计算，否则使用排序后的列表计算，两者结果一致
+    """
+    PERCENTILES = (50, 75, 90, 95, 99)
+    # 与界面颜色一致的分级：不超过40为绿色，不超过79为橙色，其余为红色
+    GREEN_MAX = 40
+    ORANGE_MAX = 79
+    BAND_LABELS = ("绿色 (≤40)", "橙色 (≤79)", "红色 (>79)")
+    
+    def __init__(self, values, bins=10):
+        if np is not None:
+            self._compute_numpy(values, bins)
+        else:
+            self._compute_python(values, bins)
+    
+    def _compute_numpy(self, values, bins):
+        array = np.asarray(values, dtype=np.float64)
+        self.count = int(array.size)
+        if not self.count:
+            self._set_empty()
+            return
+        self.minimum = float(array.min())
+        self.maximum = float(array.max())
+        self.mean = float(array.mean())
+        self.percentiles = dict(zip(self.PERCENTILES,
+                                    (float(v) for v in np.percentile(array, self.PERCENTILES))))
+        counts, edges = np.histogram(array, bins=bins, range=self._histogram_range())
+        self.histogram = list(zip(edges[:-1].tolist(), edges[1:].tolist(), counts.tolist()))
+        green = int(np.count_nonzero(array <= self.GREEN_MAX))
+        orange = int(np.count_nonzero(array <= self.ORANGE_MAX)) - green
+        self.bands = [green, orange, self.count - green - orange]
+    
+    def _compute_python(self, values, bins):
+        ordered = sorted(values)
+        self.count = len(ordered)
+        if not self.count:
+            self._set_empty()
+            return
+        self.minimum = ordered[0]
+        self.maximum = ordered[-1]
+        self.mean = sum(ordered) / self.count
+        # 线性插值，与 numpy.percentile 的默认方式相同
+        self.percentiles = {}
+        for percentile in self.PERCENTILES:
+            position = (self.count - 1) * percentile / 100
+            lower = int(position)
+            upper = min(lower + 1, self.count - 1)
+            self.percentiles[percentile] = ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+        low, high = self._histogram_range()
+        width = (high - low) / bins
+        edges = [low + width * i for i in range(bins)] + [high]
+        # 每个区间包含左端点，最后一个区间同时包含右端点（与 numpy.histogram 一致）
+        positions = [bisect.bisect_left(ordered, edge) for edge in edges[:-1]] + [self.count]
+        self.histogram = [(edges[i], edges[i + 1], positions[i + 1] - positions[i]) for i in range(bins)]
+        green = bisect.bisect_right(ordered, self.GREEN_MAX)
+        orange = bisect.bisect_right(ordered, self.ORANGE_MAX) - green
+        self.bands = [green, orange, self.count - green - orange]
+    
+    def _histogram_range(self):
+        if self.minimum == self.maximum:
+            return self.minimum - 0.5, self.maximum + 0.5
+        return self.minimum, self.maximum
+    
+    def _set_empty(self):
+        self.minimum = self.maximum = self.mean = None
+        self.percentiles = {}
+        self.histogram = []
+        self.bands = [0, 0, 0]
+    
+    def format_report(self, title, with_bands=True, bar_width=40):
+        """生成文本报告（用于等宽字体显示）"""
+        lines = [f"== {title} ==", f"变体数: {self.count}"]
+        if not self.count:
+            return "\n".join(lines)
+        
+        lines.append(f"最小: {self.minimum:.2f}  平均: {self.mean:.2f}  最大: {self.maximum:.2f}")
+        lines.append("  ".join(f"P{percentile}: {value:.2f}" for percentile, value in self.percentiles.items()))
+        
+        if with_bands:
+            lines.append("")
+            for label, count in zip(self.BAND_LABELS, self.bands):
+                lines.append(f"{label:<14} {count:>8}  {count * 100 / self.count:6.2f}%")
+        
+        lines.append("")
+        peak = max(count for _, _, count in self.histogram) or 1
+        for low, high, count in self.histogram:
+            bar = "█" * round(count * bar_width / peak)
+            lines.append(f"{low:8.2f} ~ {high:8.2f} | {count:>8} {bar}")
+        return "\n".join(lines)
+
+
+class RunDiffDialog(wx.Dialog):
+    """两次分析的对比对话框（非模态）：列出变慢和变快的变体，按变化量排序"""
+    METRICS = (("复杂度", "cycles_sum"), ("指令数", "instructions"))
+    
+    def __init__(self, parent, results_db, runs, run_labels):
+        super().__init__(parent, title="分析对比", size=(820, 560),
+                         style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.results_db = results_db
+        self.runs = runs
+        
+        # 默认当前为最近一次分析，基线为同一项目、同一类型的上一次分析
+        self.base_choice = wx.Choice(self, choices=run_labels)
+        self.current_choice = wx.Choice(self, choices=run_labels)
+        if runs:
+            self.current_choice.SetSelection(0)
+            self.base_choice.SetSelection(self.find_previous_run(0))
+        self.metric_choice = wx.Choice(self, choices=[label for label, _ in self.METRICS])
+        self.metric_choice.SetSelection(0)
+        
+        diff_btn = wx.Button(self, label="对比")
+        diff_btn.Bind(wx.EVT_BUTTON, self.on_diff)
+        diff_btn.SetBackgroundColour(wx.Colour(155, 225, 110))
+        
+        notebook = wx.Notebook(self)
+        columns = [("变体", 220), ("基线变体", 200), ("配对", 60), ("基线", 70), ("当前", 70), ("变化", 70)]
+        self.regressions_list = HotListDialog.create_list(notebook, columns)
+        self.improvements_list = HotListDialog.create_list(notebook, columns)
+        notebook.AddPage(self.regressions_list, "变慢")
+        notebook.AddPage(self.improvements_list, "变快")
+        
+        self.info_label = wx.StaticText(self, label="")
+        
+        close_btn = wx.Button(self, label="关闭")
+        close_btn.Bind(wx.EVT_BUTTON, self.on_close)
+        close_btn.SetBackgroundColour(wx.Colour(245, 95, 90))
+        
+        grid = wx.FlexGridSizer(2, 2, 5, 10)
+        grid.AddGrowableCol(1)
+        grid.Add(wx.StaticText(self, label="基线:"), flag=wx.ALIGN_CENTER_VERTICAL)
+        grid.Add(self.base_choice, flag=wx.EXPAND)
+        grid.Add(wx.StaticText(self, label="当前:"), flag=wx.ALIGN_CENTER_VERTICAL)
+        grid.Add(self.current_choice, flag=wx.EXPAND)
+        
+        query_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        query_sizer.Add(grid, proportion=1, flag=wx.EXPAND | wx.RIGHT, border=10)
+        query_sizer.Add(self.metric_choice, flag=wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, border=10)
+        query_sizer.Add(diff_btn, flag=wx.ALIGN_CENTER_VERTICAL)
+        
+        bottom_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        bottom_sizer.Add(self.info_label, proportion=1, flag=wx.ALIGN_CENTER_VERTICAL)
+        bottom_sizer.Add(close_btn, flag=wx.ALIGN_CENTER_VERTICAL)
+        
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(query_sizer, flag=wx.EXPAND | wx.ALL, border=10)
+        sizer.Add(notebook, proportion=1, flag=wx.EXPAND | wx.LEFT | wx.RIGHT, border=10)
+        sizer.Add(bottom_sizer, flag=wx.EXPAND | wx.ALL, border=10)
+        self.SetSizer(sizer)
+        
+        self.Centre()
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+    
+    def find_previous_run(self, index):
+        """查找与指定分析同一项目、同一类型和参数的上一次分析，找不到时返回下一项"""
+        _, _, project, kind, args, _ = self.runs[index]
+        for i in range(index + 1, len(self.runs)):
+            if self.runs[i][2:5] == (project, kind, args):
+                return i
+        return min(index + 1, len(self.runs) - 1)
+    
+    def on_diff(self, event):
+        """执行对比并显示结果"""
+        base_index = self.base_choice.GetSelection()
+        current_index = self.current_choice.GetSelection()
+        if base_index == wx.NOT_FOUND or current_index == wx.NOT_FOUND:
+            wx.MessageBox("请选择基线和当前分析", "提示", wx.OK | wx.ICON_WARNING)
+            return
+        metric = self.METRICS[self.metric_choice.GetSelection()][1]
+        
+        start = time.perf_counter()
+        try:
+            diff = self.results_db.diff_runs(self.runs[base_index][0], self.runs[current_index][0], metric)
+        except sqlite3.Error as e:
+            wx.MessageBox(f"对比失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        for list_ctrl, rows in ((self.regressions_list, diff["regressions"]),
+                                (self.improvements_list, diff["improvements"])):
+            list_ctrl.DeleteAllItems()
+            for row, (variant, base_variant, matched_by, base_value, value, delta) in enumerate(rows):
+                delta_text = ("+" if delta > 0 else "") + HotListDialog.format_number(delta)
+                values = [variant, base_variant, matched_by, HotListDialog.format_number(base_value),
+                          HotListDialog.format_number(value), delta_text]
+                HotListDialog.add_row(list_ctrl, row, values)
+                list_ctrl.SetItemTextColour(row, wx.Colour(220, 0, 0) if delta > 0 else wx.Colour(0, 180, 0))
+        
+        counts = diff["counts"]
+        self.info_label.SetLabel(
+            f"变慢 {counts['regressed']}，变快 {counts['improved']}，不变 {counts['unchanged']}，"
+            f"新增 {counts['added']}，移除 {counts['removed']}（耗时 {elapsed_ms:.0f} ms）"
+        )
+    
+    def on_close(self, event):
+        """处理关闭事件"""
+        self.Destroy()
+
+
+class CompilerBackend:
+    """编译器调用后端：以参数列表直接启动编译器进程，不经过cmd/PowerShell
+
+    argv_prefix 为启动编译器的参数前缀（例如 [malisc.exe 路径]），
+    identity_path 用于计算编译缓存中的编译器指纹。
+    """
+
+    def __init__(self, argv_prefix, identity_path, name="malisc"):
+        self.argv_prefix = list(argv_prefix)
+        self.identity_path = identity_path
+        self.name = name
+
+    def build_argv(self, frag_file_path, args=()):
+        """生成完整的命令行参数列表：前缀 + 编译参数 + 文件路径"""
+        return self.argv_prefix + list(args) + [frag_file_path]
+
+    def run(self, frag_file_path, args=(), timeout=None, cancel_token=None):
+        """编译指定文件，返回 subprocess.CompletedProcess
+        超过 timeout 秒时终止进程并抛出 subprocess.TimeoutExpired；
+        通过 cancel_token 取消时终止进程并抛出 CompileCancelled
+        """
+        argv = self.build_argv(frag_file_path, args)
+        process = subprocess.Popen(
+            argv,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, encoding='utf-8', errors='replace',
+            # Windows下不弹出控制台窗口
+            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+        )
+        if cancel_token is not None:
+            cancel_token.register(process)
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise
+        finally:
+            if cancel_token is not None:
+                cancel_token.unregister(process)
+
+        # 被取消终止的进程没有有效结果；取消前已正常结束的结果仍然保留
+        if process.returncode != 0 and cancel_token is not None and cancel_token.cancelled:
+            raise CompileCancelled(frag_file_path)
+        return subprocess.CompletedProcess(argv, process.returncode, stdout, stderr)
+
+    def run_streaming(self, frag_file_path, args=(), timeout=None, cancel_token=None,
+                      on_metrics=None, max_output_chars=1024 * 1024):
+        """流式编译：逐行读取编译器输出并立即解析，返回 (subprocess.CompletedProcess, MaliscMetrics)
+        复杂度和指令数解析出来后立即调用 on_metrics(metrics)，不必等待进程结束；
+        保留的输出文本不超过 max_output_chars（超出部分只保留开头和结尾），内存占用与输出大小无关。
+        超时和取消的处理与 run 相同
+        """
+        argv = self.build_argv(frag_file_path, args)
+        process = subprocess.Popen(
+            argv,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, encoding='utf-8', errors='replace',
+            # Windows下不弹出控制台窗口
+            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+        )
+        if cancel_token is not None:
+            cancel_token.register(process)
+        
+        # stderr 在单独的线程中读取，避免管道写满导致编译器阻塞
+        stderr_buffer = BoundedTextBuffer(max_output_chars // 4)
+        stderr_thread = threading.Thread(target=stderr_buffer.consume, args=(process.stderr,))
+        stderr_thread.daemon = True
+        stderr_thread.start()
+        
+        # 超时由计时器终止进程，读取循环随管道关闭而结束
+        timed_out = threading.Event()
+        def on_timeout():
+            timed_out.set()
+            process.kill()
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, on_timeout)
+            timer.daemon = True
+            timer.start()
+        
+        parser = MaliscOutputParser()
+        stdout_buffer = BoundedTextBuffer(max_output_chars)
+        notified = on_metrics is None
+        try:
+            for line in process.stdout:
+                stdout_buffer.append(line)
+                parser.feed(line.rstrip('\r\n'))
+                if not notified and parser.has_key_fields:
+                    notified = True
+                    on_metrics(parser.metrics)
+            process.wait()
+            stderr_thread.join()
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            if cancel_token is not None:
+                cancel_token.unregister(process)
+        
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(argv, timeout)
+        if process.returncode != 0 and cancel_token is not None and cancel_token.cancelled:
+            raise CompileCancelled(frag_file_path)
+        completed = subprocess.CompletedProcess(argv, process.returncode,
+                                                stdout_buffer.getvalue(), stderr_buffer.getvalue())
+        return completed, parser.metrics
+
+
+class BoundedTextBuffer:
+    """有上限的文本缓冲区：超出 max_chars 后只保留开头和结尾各一半，中间记录省略的行数"""
+
+    def __init__(self, max_chars):
+        self.head_limit = max_chars // 2
+        self.tail_limit = max_chars - self.head_limit
+        self.head = []
+        self.head_chars = 0
+        self.tail = collections.deque()
+        self.tail_chars = 0
+        self.dropped_lines = 0
+
+    def append(self, line):
+        """追加一行（包含换行符）"""
+        if not self.tail and self.head_chars + len(line) <= self.head_limit:
+            self.head.append(line)
+            self.head_chars += len(line)
+            return
+        self.tail.append(line)
+        self.tail_chars += len(line)
+        while self.tail_chars > self.tail_limit and self.tail:
+            self.tail_chars -= len(self.tail.popleft())
+            self.dropped_lines += 1
+
+    def consume(self, stream):
+        """读取整个文本流（用于后台线程中读取stderr）"""
+        for line in stream:
+            self.append(line)
+        stream.close()
+
+    def getvalue(self):
+        """返回保留的文本"""
+        if not self.dropped_lines:
+            return "".join(self.head) + "".join(self.tail)
+        return ("".join(self.head)
+                + f"\n... 输出过长，已省略 {self.dropped_lines} 行 ...\n\n"
+                + "".join(self.tail))
+
+
+class ScriptBackend(CompilerBackend):
+    """替身编译器后端：运行本地脚本输出malisc格式的结果，便于在Linux上测试和压测"""
+
+    def __init__(self, script_path):
+        script_path = os.path.abspath(script_path)
+        if script_path.lower().endswith('.py'):
+            # Python脚本使用当前解释器运行
+            argv_prefix = [sys.executable, script_path]
+        else:
+            argv_prefix = [script_path]
+        super().__init__(argv_prefix, script_path, name=os.path.basename(script_path))
+
+
+class TempSourcePool:
+    """临时源码文件池：每个工作线程复用一个固定的临时文件，把内存中的变体交给编译器
+
+    编译器只能从文件读取源码，池中的文件按 线程 + 扩展名 复用，
+    分析成千上万个变体也只会产生与工作线程数相同数量的临时文件。
+    """
+
+    def __init__(self):
+        self._dir = None
+        self._lock = threading.Lock()
+
+    def write(self, content, suffix=".frag"):
+        """把内容写入当前线程的临时文件并返回路径（同一线程下次写入会覆盖）"""
+        with self._lock:
+            if self._dir is None or not os.path.isdir(self._dir):
+                self._dir = tempfile.mkdtemp(prefix="shadertool_")
+        path = os.path.join(self._dir, f"variant_{threading.get_ident()}{suffix}")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def cleanup(self):
+        """删除临时目录"""
+        with self._lock:
+            if self._dir is not None:
+                shutil.rmtree(self._dir, ignore_errors=True)
+                self._dir = None
+
+
+class CompileCache:
+    """编译结果磁盘缓存（按内容寻址）
+
+    缓存键由 frag 文件内容、编译器指纹（路径/大小/修改时间）和编译参数共同计算，
+    每个条目保存完整的编译输出和解析出的指标，程序重启后依然有效。
+    缓存总大小超过上限时按最近使用时间淘汰最旧的条目；编译器指纹变化（升级）时整体失效。
+    """
+    META_FILE = "cache_meta.json"
+    # 规范化规则（见 ShaderBrowser.normalize_shader_source）变化时递增，旧规则下的条目不再命中
+    KEY_VERSION = 2
+
+    def __init__(self, cache_dir, max_bytes=200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None  # 首次写入时才扫描目录统计
+        self._compiler_fingerprint = None
+
+    @staticmethod
+    def compiler_fingerprint(compiler_path):
+        """根据编译器路径、文件大小和修改时间生成指纹，编译器升级后指纹随之变化"""
+        try:
+            stat = os.stat(compiler_path)
+            return f"{os.path.abspath(compiler_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        except OSError:
+            return os.path.abspath(compiler_path)
+
+    def bind_compiler(self, compiler_path):
+        """绑定当前使用的编译器；若与上次记录的指纹不同则清空缓存"""
+        fingerprint = self.compiler_fingerprint(compiler_path)
+        if fingerprint == self._compiler_fingerprint:
+            return fingerprint
+
+        with self._lock:
+            meta_path = os.path.join(self.cache_dir, self.META_FILE)
+            old_fingerprint = None
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    old_fingerprint = json.load(f).get("compiler_fingerprint")
+            except Exception:
+                pass
+
+            if old_fingerprint != fingerprint:
+                self._clear_entries()
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(meta_path, 'w', encoding='utf-8') as f:
+                    json.dump({"compiler_fingerprint": fingerprint}, f, indent=2, ensure_ascii=False)
+
+            self._compiler_fingerprint = fingerprint
+        return fingerprint
+
+    def make_key(self, content, compiler_path, args=()):
+        """计算缓存键：内容 + 编译器指纹 + 编译参数"""
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        fingerprint = self.bind_compiler(compiler_path)
+        digest = hashlib.sha256()
+        digest.update(f"v{self.KEY_VERSION}".encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(fingerprint.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update('\0'.join(args).encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(content)
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """读取缓存条目，未命中返回None；命中时刷新修改时间用于LRU淘汰"""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key, entry):
+        """写入缓存条目，并在超出大小上限时淘汰旧条目"""
+        data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._scan_entries())
+
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            # 先写临时文件再替换，避免并发读取到写了一半的条目
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._total_bytes += len(data) - old_size
+
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def clear(self):
+        """清空所有缓存条目，返回删除的条目数量"""
+        with self._lock:
+            return self._clear_entries()
+
+    def _scan_entries(self):
+        """列出所有缓存条目：(路径, 大小, 修改时间)"""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json') or name == self.META_FILE:
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self):
+        """按最近使用时间从旧到新删除条目，直到总大小降到上限的90%以下"""
+        target = self.max_bytes * 0.9
+        entries = sorted(self._scan_entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._total_bytes = total
+
+    def _clear_entries(self):
+        removed = 0
+        for path, _, _ in self._scan_entries():
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        self._total_bytes = 0
+        return removed
+
+
+class FragmentSplitter:
+    """从Unity编译后的shader文件中分离frag变体（以及可选的顶点程序）
+    所有方法都是类方法，可以在子进程中执行（见 ShaderBrowser.separate_shaders）
+    """
+    # 程序块的开始标记 "#ifdef FRAGMENT"/"#ifdef VERTEX" 的下一行必须匹配此格式；分隔线之后的内容不属于变体
+    VERSION_PATTERN = re.compile(r'#version\s+\d+\s+es')
+    SEPARATOR = "//////////////////////////////////////////////////////"
+    # 在整个变体文本上替换版本号时不能跨行匹配（#version 行的 \s 不能匹配到下一行）
+    TEXT_VERSION_PATTERN = re.compile(r'#version[^\S\n]+\d+[^\S\n]+es')
+    # 单独的 \r 换行（不是 \r\n）在文本模式下也算换行，这种文件先统一换行再查找
+    LONE_CR_PATTERN = re.compile(rb'\r(?!\n)')
+    # 变体的关键字行："Global Keywords: A B"、"Local Keywords: <none>"，旧版本为 Keywords { "A" "B" }
+    KEYWORD_SCOPES = (b'', b'Global', b'Local')
+    
+    @classmethod
+    def separate(cls, shader_path, base_directory, include_vertex=False, keywords=None):
+        """从shader文件中分离frag内容（include_vertex 为 True 时包括 .vert），写入 base_directory/Frags 目录，
+        返回写入的文件名列表；变体逐个提取并立即写入文件，内存中同时只保留一个变体
+        keywords 为字典时填入每个frag变体的关键字 {frag文件名: [关键字, ...]}
+        """
+        frags_dir = os.path.join(base_directory, "Frags")
+        frag_files = []
+        for frag_filename, content in cls.iter_variants(shader_path, include_vertex, keywords):
+            if not frag_files:
+                # 找到第一个变体时才创建Frags目录
+                os.makedirs(frags_dir, exist_ok=True)
+            frag_filepath = os.path.join(frags_dir, frag_filename)
+            with open(frag_filepath, 'w', encoding='utf-8') as f:
+                f.write(content)
+            frag_files.append(frag_filename)
+        
+        return frag_files
+    
+    @classmethod
+    def separate_incremental(cls, shader_path, base_directory, previous_variants=(), include_vertex=False):
+        """分离shader文件并删除上次分离产生、这次不再存在的变体文件
+        返回写入清单的条目 {"size", "mtime_ns", "hash", "vertex", "variants", "keywords"}（见 FragManifest）
+        """
+        # 先记录文件状态再读取：分离期间文件被修改时，下次检查会发现变化并重新分离
+        stat = os.stat(shader_path)
+        keywords = {}
+        frag_files = cls.separate(shader_path, base_directory, include_vertex, keywords)
         
-        sizer.Add(bottom_sizer, flag=wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, border=10)
-        self.SetSizer(sizer)
+        frags_dir = os.path.join(base_directory, "Frags")
+        for frag_file in set(previous_variants) - set(frag_files):
+            try:
+                os.remove(os.path.join(frags_dir, frag_file))
+            except FileNotFoundError:
+                pass
         
-        # 居中显示
-        self.Centre()
+        # 哈希在分离之后计算：分离或计算哈希期间文件被修改时（大小或修改时间与分离前不同），
+        # 哈希不一定对应分离时读到的内容，不记录哈希，下次检查时重新分离
+        content_hash = FragManifest.file_hash(shader_path)
+        current = os.stat(shader_path)
+        if (current.st_size, current.st_mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            content_hash = None
+        
+        return {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": content_hash,
+            "vertex": include_vertex,
+            "variants": frag_files,
+            "keywords": keywords,
+        }
+    
+    @classmethod
+    def extract(cls, shader_path, include_vertex=False, keywords=None):
+        """从shader文件中提取所有frag变体（只在内存中处理，不写文件）
+        返回 [(frag文件名, frag内容), ...]，include_vertex 为 True 时包括 .vert；keywords 见 separate
+        """
+        return list(cls.iter_variants(shader_path, include_vertex, keywords))
+    
+    @classmethod
+    def iter_variants(cls, shader_path, include_vertex=False, keywords=None):
+        """依次生成shader文件中的变体 (文件名, 内容)
+        frag变体从 "#ifdef FRAGMENT" 行开始（下一行必须是 "#version X es"），到下一个变体开始或文件结尾为止。
+        include_vertex 为 True 时，同一段（两条分隔线之间）中frag变体之前的 "#ifdef VERTEX" 程序
+        以相同的编号输出为 .vert 文件（在对应的 .frag 之前生成）。
+        keywords 为字典时，生成每个frag变体之前填入它的关键字（见 find_keyword_sections）。
+        文件通过内存映射按字节查找边界，只解码需要输出的内容
+        """
+        if not os.path.exists(shader_path):
+            raise FileNotFoundError(f"文件不存在: {shader_path}")
         
-        # 绑定关闭事件
-        self.Bind(wx.EVT_CLOSE, self.on_close)
+        shader_name = os.path.splitext(os.path.basename(shader_path))[0]
+        with open(shader_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                lone_cr = cls.LONE_CR_PATTERN.search(data) is not None
+                if not lone_cr:
+                    yield from cls.iter_blocks(data, shader_name, include_vertex, keywords)
+                    return
         
-        # 设置默认按钮为关闭按钮
-        self.close_btn.SetDefault()
+        # 包含单独 \r 换行的文件（极少见）：按文本模式分块读取统一换行，写入临时文件后同样内存映射查找，
+        # 内存中同时只保留一个数据块
+        with open(shader_path, 'r', encoding='utf-8') as f, tempfile.TemporaryFile() as normalized:
+            for chunk in iter(lambda: f.read(1024 * 1024), ''):
+                normalized.write(chunk.encode('utf-8'))
+            normalized.flush()
+            if normalized.tell() == 0:
+                return
+            with mmap.mmap(normalized.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield from cls.iter_blocks(data, shader_name, include_vertex, keywords)
+    
+    @classmethod
+    def iter_blocks(cls, data, shader_name, include_vertex=False, keywords=None):
+        """在文件字节中查找并生成所有变体 (文件名, 内容)，见 iter_variants"""
+        starts = cls.find_starts(data, b'#ifdef FRAGMENT')
+        vertex_starts = cls.find_starts(data, b'#ifdef VERTEX') if include_vertex else []
+        keyword_sections = cls.find_keyword_sections(data) if keywords is not None else []
+        separator = cls.SEPARATOR.encode('ascii')
+        # 有分隔线的文件中，同一段内的多个frag变体（例如不同的 Hardware tier）共用段首的关键字行；
+        # 没有分隔线的旧格式（Keywords { }）每个变体前都有自己的关键字行
+        has_separator = keywords is not None and data.find(separator) != -1
+        
+        for index, (start, content_start) in enumerate(starts, start=1):
+            previous_start = starts[index - 2][0] if index > 1 else -1
+            if keywords is not None:
+                # 当前frag变体之前最近的关键字行，中间不能隔着分隔线（没有分隔线时必须在上一个frag变体之后），
+                # 没有时为空列表
+                i = bisect.bisect_left(keyword_sections, (start,)) - 1
+                if i < 0:
+                    in_section = False
+                elif has_separator:
+                    in_section = data.find(separator, keyword_sections[i][0], start) == -1
+                else:
+                    in_section = keyword_sections[i][0] > previous_start
+                keywords[f"{shader_name}_{index:03d}.frag"] = keyword_sections[i][1] if in_section else []
+            
+            if vertex_starts:
+                # 上一个frag变体之后、当前frag变体之前最近的顶点程序，中间不能隔着分隔线
+                i = bisect.bisect_left(vertex_starts, (start,)) - 1
+                if (i >= 0 and vertex_starts[i][0] > previous_start
+                        and data.find(separator, vertex_starts[i][0], start) == -1):
+                    yield f"{shader_name}_{index:03d}.vert", cls.slice_content(data, vertex_starts[i][1], start)
+            
+            end = starts[index][0] if index < len(starts) else len(data)
+            yield f"{shader_name}_{index:03d}.frag", cls.slice_content(data, content_start, end)
+    
+    @classmethod
+    def find_starts(cls, data, marker):
+        """在文件字节中查找所有程序块的开始位置 [(marker 行的开头, 下一行的开头), ...]
+        marker（"#ifdef FRAGMENT" 或 "#ifdef VERTEX"）的下一行必须是 "#version X es"
+        """
+        starts = []
+        position = data.find(marker)
+        while position != -1:
+            line_start = data.rfind(b'\n', 0, position) + 1
+            line_end = data.find(b'\n', position)
+            if line_end == -1:
+                # 最后一行，后面没有 #version 行
+                break
+            next_end = data.find(b'\n', line_end + 1)
+            if next_end == -1:
+                next_end = len(data)
+            # 只解码候选的下一行，用正则判断
+            next_line = data[line_end + 1:next_end].decode('utf-8', errors='replace')
+            if cls.VERSION_PATTERN.search(next_line):
+                starts.append((line_start, line_end + 1))
+            position = data.find(marker, line_end)
+        return starts
+    
+    @classmethod
+    def find_keyword_sections(cls, data):
+        """在文件字节中查找变体的关键字行，返回 [(关键字行的开头, [关键字, ...]), ...]
+        紧跟在 "Global Keywords:" 之后的 "Local Keywords:" 行合并到同一组，"<none>" 不算关键字
+        """
+        sections = []
+        previous_end = -1
+        position = data.find(b'Keywords')
+        while position != -1:
+            line_start = data.rfind(b'\n', 0, position) + 1
+            line_end = data.find(b'\n', position)
+            if line_end == -1:
+                line_end = len(data)
+            # 行首必须是关键字标记（排除代码或注释中出现的 "Keywords"）
+            scope = data[line_start:position].strip()
+            rest = data[position + len(b'Keywords'):line_end].strip()
+            if scope in cls.KEYWORD_SCOPES and rest[:1] in (b':', b'{', b''):
+                rest = rest.lstrip(b':').strip()
+                if rest == b'<none>':
+                    names = []
+                else:
+                    rest = rest.decode('utf-8', errors='replace').replace('{', ' ').replace('}', ' ').replace('"', ' ')
+                    names = [name for name in rest.split() if name != '<none>']
+                if scope == b'Local' and sections and previous_end + 1 == line_start:
+                    sections[-1][1].extend(name for name in names if name not in sections[-1][1])
+                else:
+                    sections.append((line_start, list(dict.fromkeys(names))))
+                previous_end = line_end
+            position = data.find(b'Keywords', line_end)
+        return sections
+    
+    @classmethod
+    def slice_content(cls, data, content_start, end):
+        """截取并解码一个变体的内容：去掉分隔线之后的内容、最后一个 #endif 及其之前的空行，修改版本号"""
+        separator = data.find(cls.SEPARATOR.encode('ascii'), content_start, end)
+        if separator != -1:
+            end = data.rfind(b'\n', content_start, separator) + 1 or content_start
+        
+        endif = data.rfind(b'#endif', content_start, end)
+        if endif != -1:
+            end = data.rfind(b'\n', content_start, endif) + 1 or content_start
+        
+        text = data[content_start:end].decode('utf-8')
+        if '\r' in text:
+            # 与文本模式读取一致，\r\n 转换为 \n
+            text = text.replace('\r\n', '\n')
+        
+        if endif != -1:
+            # 移除 #endif 之前的空行
+            while text:
+                line_start = text.rfind('\n', 0, len(text) - 1) + 1
+                if text[line_start:].strip() != '':
+                    break
+                text = text[:line_start]
         
-        # 在对话框显示后将焦点设置到关闭按钮
-        self.Bind(wx.EVT_SHOW, self.on_show)
+        if '#version' in text:
+            text = cls.TEXT_VERSION_PATTERN.sub('#version 320 es', text)
+        return text
+
+
+class FragManifest:
+    """Frags 目录中的分离清单：记录每个shader文件分离时的大小、修改时间、内容哈希、产生的变体和变体的关键字
+    shader没有变化（并且变体文件都在）时跳过分离；变化时重新分离，并删除不再产生的旧变体
+    关键字索引（variant_keywords）只读取清单，按关键字筛选时不需要重新读取shader
+    """
+    MANIFEST_FILE = "frag_manifest.json"
+    # 分离规则变化时递增，旧版本的清单整体失效（2: 记录变体的关键字；3: 同一段内的多个变体共用关键字）
+    VERSION = 3
     
-    def calculate_longest_path_cycles_sum(self, output):
-        """计算Longest Path Cycles三个值的和"""
+    def __init__(self, frags_dir):
+        self.frags_dir = frags_dir
+        self._entries = {}
+        self._dirty = False
+        self._frag_files = None  # 首次需要时才列出Frags目录
         try:
-            # 查找"Longest Path Cycles:"在文本中的位置
-            lines = output.split('\n')
-            for line in lines:
-                if "Longest Path Cycles:" in line:
-                    # 提取冒号后面的部分
-                    parts = line.split("Longest Path Cycles:")
-                    if len(parts) > 1:
-                        values_str = parts[1].strip()
-                        
-                        # 提取所有数字（可能用逗号、空格分隔，包括小数）
-                        import re
-                        # 匹配整数和小数，例如：1.7, 2, 0.5, 3.14
-                        numbers = re.findall(r'\d+\.?\d*', values_str)
-                        
-                        if len(numbers) >= 3:
-                            # 取前三个数字
-                            try:
-                                num1 = float(numbers[0])
-                                num2 = float(numbers[1])
-                                num3 = float(numbers[2])
-                                return num1 + num2 + num3
-                            except ValueError:
-                                return None
+            with open(os.path.join(frags_dir, self.MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION:
+                self._entries = data.get("shaders", {})
+        except (OSError, ValueError, AttributeError):
+            pass
+    
+    @staticmethod
+    def file_hash(path):
+        """文件内容的 SHA-256"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def unchanged_variants(self, file_name, shader_path, include_vertex=False):
+        """shader自上次分离后没有变化、并且变体文件都在时返回变体文件名列表，否则返回 None
+        大小和修改时间都相同时直接认为没有变化；只有修改时间变化时比较内容哈希；
+        是否提取顶点程序（include_vertex）与上次不同时需要重新分离
+        """
+        entry = self._entries.get(file_name)
+        if entry is None or entry.get("vertex", False) != include_vertex:
             return None
-        except Exception as e:
-            print(f"计算Longest Path Cycles总和时出错: {e}")
+        stat = os.stat(shader_path)
+        if stat.st_size != entry.get("size"):
+            return None
+        if stat.st_mtime_ns != entry.get("mtime_ns"):
+            if self.file_hash(shader_path) != entry.get("hash"):
+                return None
+            # 内容没有变化（例如只是重新保存），更新修改时间，下次不用再计算哈希
+            entry["mtime_ns"] = stat.st_mtime_ns
+            self._dirty = True
+        
+        variants = entry.get("variants", [])
+        if not all(os.path.exists(os.path.join(self.frags_dir, frag_file)) for frag_file in variants):
             return None
+        return variants
     
-    def on_show(self, event):
-        """处理对话框显示事件：将焦点设置到关闭按钮"""
-        if event.IsShown():
-            # 延迟设置焦点，确保对话框完全显示
-            wx.CallAfter(self.close_btn.SetFocus)
-        event.Skip()
+    def previous_variants(self, file_name):
+        """上次从该shader分离出的变体；清单中没有记录时按文件名（shader名_编号.frag/.vert）在Frags目录中查找"""
+        entry = self._entries.get(file_name)
+        if entry is not None:
+            return entry.get("variants", [])
+        
+        if self._frag_files is None:
+            self._frag_files = os.listdir(self.frags_dir) if os.path.isdir(self.frags_dir) else []
+        shader_name = os.path.splitext(file_name)[0]
+        pattern = re.compile(rf'^{re.escape(shader_name)}_\d{{3}}\.(?:frag|vert)$', re.IGNORECASE)
+        return [frag_file for frag_file in self._frag_files if pattern.match(frag_file)]
     
-    def on_close(self, event):
-        """处理关闭事件"""
-        self.Destroy()
+    def variant_keywords(self):
+        """返回清单中所有frag变体的关键字 {frag文件名: [关键字, ...]}"""
+        keywords = {}
+        for entry in self._entries.values():
+            keywords.update(entry.get("keywords", {}))
+        return keywords
     
-    @staticmethod
-    def copy_to_clipboard(text):
-        """复制文本到剪贴板"""
-        import wx
-        if wx.TheClipboard.Open():
-            wx.TheClipboard.SetData(wx.TextDataObject(text))
-            wx.TheClipboard.Close()
-            return True
-        return False
+    def update(self, file_name, entry):
+        """记录一次分离的结果"""
+        self._entries[file_name] = entry
+        self._dirty = True
+    
+    def clear(self):
+        """清除清单（Frags目录中的变体被清除时调用），下次分离时所有shader都重新分离"""
+        self._entries = {}
+        self._dirty = False
+        self._frag_files = None
+        try:
+            os.remove(os.path.join(self.frags_dir, self.MANIFEST_FILE))
+        except FileNotFoundError:
+            pass
+    
+    def save(self):
+        """有变化时写入清单（先写临时文件再替换）"""
+        if not self._dirty or not os.path.isdir(self.frags_dir):
+            return
+        path = os.path.join(self.frags_dir, self.MANIFEST_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": self.VERSION, "shaders": self._entries}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._dirty = False
 
 
 class ShaderBrowser(wx.Frame):
     # 版本号定义，方便更新
     VERSION = "2.4"
     CONFIG_FILE = "shader_browser_config.json"
+    CACHE_DIR = "compile_cache"
+    RESULTS_DB_FILE = "shader_results.db"
     
     def __init__(self, parent, title):
         # 在标题中添加版本号
@@ -374,6 +2568,50 @@ class ShaderBrowser(wx.Frame):
         self.max_cycles_sum = 0
         self.max_instructions = 0
 
+        # 编译结果磁盘缓存（大小上限可通过配置项 compile_cache_max_mb 调整）
+        config = self.load_config()
+        cache_max_mb = config.get("compile_cache_max_mb", 200)
+        self.compile_cache = CompileCache(self.CACHE_DIR, max_bytes=int(cache_max_mb) * 1024 * 1024)
+        
+        # 单次编译的超时时间（秒），可通过配置项 compile_timeout 调整
+        self.compile_timeout = config.get("compile_timeout", 120)
+        
+        # 流式读取编译输出（配置项 streaming_output），保留的输出不超过 max_output_kb
+        self.streaming_output = config.get("streaming_output", True)
+        self.max_output_chars = int(config.get("max_output_kb", 1024)) * 1024
+        
+        # 所有编译任务共享的优先级调度器（线程数见 get_compile_workers）
+        self.compile_scheduler = CompileScheduler(self.get_compile_workers())
+        
+        # 后台预编译任务的取消令牌
+        self.prefetch_token = None
+        
+        # 内存分析模式下的变体内容 {frag文件名: 内容}，以及把它们交给编译器的临时文件池
+        self.memory_variants = {}
+        self.temp_source_pool = TempSourcePool()
+        # frag列表中变体的关键字 {frag文件名: [关键字, ...]}，来自分离清单或内存中的提取
+        self.variant_keywords = {}
+        
+        # 变体指标存储，frag列表按行显示其中的记录
+        self.metric_store = MetricStore()
+        
+        # 分析结果数据库：批量分析和多核扫描的结果都会保存，供结果库查询
+        try:
+            self.results_db = ResultsDatabase(self.RESULTS_DB_FILE)
+        except sqlite3.Error as e:
+            self.results_db = None
+            print(f"打开结果数据库失败: {e}")
+        
+        # 最近一次批量分析的热点统计（HotListTracker），前 K 个的数量见配置项 hot_list_size
+        self.hot_list = None
+        self.hot_list_size = config.get("hot_list_size", 20)
+        
+        # 分离多个shader时使用的进程数（配置项 separate_processes），0 表示使用CPU核心数
+        self.separate_processes = int(config.get("separate_processes", 0))
+        
+        # 分离和分析时是否同时提取与frag配对的顶点程序（配置项 extract_vertex，由"含顶点"复选框切换）
+        self.extract_vertex = bool(config.get("extract_vertex", False))
+
         # 恢复保存的窗口位置和大小（必须在 InitUI/Centre 之前调用）
         self._geometry_restored: bool = self.load_window_geometry()
 
@@ -519,14 +2757,59 @@ class ShaderBrowser(wx.Frame):
         self.save_checkbox.Bind(wx.EVT_CHECKBOX, self.on_save_checkbox_changed)
         hbox2.Add(self.save_checkbox, flag=wx.ALIGN_CENTER | wx.LEFT, border=10)
 
+        # 添加"预编译"复选框：空闲时在后台预编译可见及相邻的变体
+        self.prefetch_checkbox = wx.CheckBox(panel, label="预编译")
+        self.prefetch_checkbox.SetValue(False)  # 默认不勾选
+        self.prefetch_checkbox.SetToolTip("空闲时在后台以低优先级预编译可见及相邻的变体")
+        # 设置浅黄色背景
+        self.prefetch_checkbox.SetBackgroundColour(wx.Colour(255, 255, 224))  # 浅黄色
+        # 绑定状态改变事件，保存配置
+        self.prefetch_checkbox.Bind(wx.EVT_CHECKBOX, self.on_prefetch_checkbox_changed)
+        hbox2.Add(self.prefetch_checkbox, flag=wx.ALIGN_CENTER | wx.LEFT, border=10)
+
+        # 添加"仅分析"复选框：查找最高复杂度时变体只保存在内存中，不写入Frags目录
+        self.memory_checkbox = wx.CheckBox(panel, label="仅分析")
+        self.memory_checkbox.SetValue(False)  # 默认不勾选
+        self.memory_checkbox.SetToolTip("查找最高复杂度时只在内存中分析变体，不写入Frags目录")
+        # 设置浅黄色背景
+        self.memory_checkbox.SetBackgroundColour(wx.Colour(255, 255, 224))  # 浅黄色
+        # 绑定状态改变事件，保存配置
+        self.memory_checkbox.Bind(wx.EVT_CHECKBOX, self.on_memory_checkbox_changed)
+        hbox2.Add(self.memory_checkbox, flag=wx.ALIGN_CENTER | wx.LEFT, border=10)
+
+        # 添加"含顶点"复选框：分离和分析时同时提取与frag配对的顶点程序（.vert）
+        self.vertex_checkbox = wx.CheckBox(panel, label="含顶点")
+        self.vertex_checkbox.SetValue(self.extract_vertex)
+        self.vertex_checkbox.SetToolTip("分离和查找最高复杂度时同时提取每个变体的顶点程序(.vert)并编译")
+        # 设置浅黄色背景
+        self.vertex_checkbox.SetBackgroundColour(wx.Colour(255, 255, 224))  # 浅黄色
+        # 绑定状态改变事件，保存配置
+        self.vertex_checkbox.Bind(wx.EVT_CHECKBOX, self.on_vertex_checkbox_changed)
+        hbox2.Add(self.vertex_checkbox, flag=wx.ALIGN_CENTER | wx.LEFT, border=10)
+
         # 添加可伸缩的空间，使后面的按钮靠右对齐
         hbox2.AddStretchSpacer()
         
+        self.coreSweep_btn = wx.Button(panel, label="多核扫描")
+        self.coreSweep_btn.Bind(wx.EVT_BUTTON, self.on_core_sweep)
+        self.coreSweep_btn.SetToolTip("针对多个Mali核心(-c)编译选中 shader 的所有变体，显示各核心的最坏情况")
+        self.coreSweep_btn.SetBackgroundColour(wx.Colour(173, 216, 230))
+        hbox2.Add(self.coreSweep_btn, flag=wx.ALIGN_CENTER | wx.RIGHT, border=10)
         self.findHighest_btn = wx.Button(panel, label="最高复杂度")
         self.findHighest_btn.Bind(wx.EVT_BUTTON, self.on_findHighest_frag)
         self.findHighest_btn.SetToolTip("找到左边列表选中 shader 的最高复杂度变体")
         self.findHighest_btn.SetBackgroundColour(wx.Colour(173, 216, 230))
         hbox2.Add(self.findHighest_btn, flag=wx.ALIGN_CENTER | wx.RIGHT, border=10)
+        self.hotList_btn = wx.Button(panel, label="热点列表")
+        self.hotList_btn.Bind(wx.EVT_BUTTON, self.on_hot_list)
+        self.hotList_btn.SetToolTip("查看最近一次最高复杂度查找中最差的变体和各shader的汇总")
+        self.hotList_btn.SetBackgroundColour(wx.Colour(173, 216, 230))
+        hbox2.Add(self.hotList_btn, flag=wx.ALIGN_CENTER | wx.RIGHT, border=10)
+        self.resultsDb_btn = wx.Button(panel, label="结果库")
+        self.resultsDb_btn.Bind(wx.EVT_BUTTON, self.on_results_db)
+        self.resultsDb_btn.SetToolTip("查询已保存的分析结果（不需要重新编译）")
+        self.resultsDb_btn.SetBackgroundColour(wx.Colour(173, 216, 230))
+        hbox2.Add(self.resultsDb_btn, flag=wx.ALIGN_CENTER | wx.RIGHT, border=10)
         self.openFrag_btn = wx.Button(panel, label="打开frag变体")
         self.openFrag_btn.Bind(wx.EVT_BUTTON, self.on_open_frag)
         self.openFrag_btn.SetBackgroundColour(wx.Colour(164, 188, 250))  # 浅蓝色
@@ -536,6 +2819,11 @@ class ShaderBrowser(wx.Frame):
         self.delFrag_btn.SetToolTip("删除所有frag变体文件")
         self.delFrag_btn.SetBackgroundColour(wx.Colour(250, 128, 114))  # 浅红色
         hbox2.Add(self.delFrag_btn, flag=wx.ALIGN_CENTER | wx.RIGHT, border=10)
+        self.clearCache_btn = wx.Button(panel, label="清除缓存")
+        self.clearCache_btn.Bind(wx.EVT_BUTTON, self.on_clear_cache)
+        self.clearCache_btn.SetToolTip("清空编译结果缓存（升级编译器后会自动清空）")
+        self.clearCache_btn.SetBackgroundColour(wx.Colour(255, 182, 193))  # 浅红色
+        hbox2.Add(self.clearCache_btn, flag=wx.ALIGN_CENTER | wx.RIGHT, border=10)
         
         vbox.Add(hbox2, flag=wx.EXPAND | wx.TOP, border=10)
         
@@ -585,6 +2873,15 @@ class ShaderBrowser(wx.Frame):
         # frag_label = wx.StaticText(panel, label="frag 列表:")
         # hbox_frag_labels.Add(frag_label, flag=wx.ALIGN_CENTER_VERTICAL)
         
+        # 左侧：按关键字筛选frag列表（空格分隔，变体需包含所有关键字）
+        keyword_label = wx.StaticText(panel, label="关键字:")
+        hbox_frag_labels.Add(keyword_label, flag=wx.ALIGN_CENTER_VERTICAL)
+        self.keyword_filter_text = wx.TextCtrl(panel, size=(220, -1))
+        self.keyword_filter_text.SetHint("如 _SHADOWS_SOFT")
+        self.keyword_filter_text.SetToolTip("只显示包含所有这些关键字的变体（关键字在分离时记录，不需要重新读取shader）")
+        self.keyword_filter_text.Bind(wx.EVT_TEXT, self.on_keyword_filter_changed)
+        hbox_frag_labels.Add(self.keyword_filter_text, flag=wx.ALIGN_CENTER_VERTICAL | wx.LEFT, border=5)
+        
         # 添加可伸缩空间，使右侧内容靠右对齐
         hbox_frag_labels.AddStretchSpacer()
         
@@ -617,10 +2914,10 @@ class ShaderBrowser(wx.Frame):
         self.file_list.SetMinSize((0, -1))  # 👈 关键：允许水平方向被压缩
         hbox_lists.Add(self.file_list, proportion=1, flag=wx.EXPAND)
 
-        # 右侧：frag 列表框（与左侧列表之间添加10像素间距）
-        self.frag_list = wx.ListBox(panel, style=wx.LB_SINGLE | wx.LB_HSCROLL)
-        self.frag_list.Bind(wx.EVT_LISTBOX_DCLICK, self.on_frag_double_click)
-        self.frag_list.Bind(wx.EVT_LISTBOX, self.on_frag_click)
+        # 右侧：frag 变体表（虚拟列表，可按列排序；与左侧列表之间添加10像素间距）
+        self.frag_list = VariantListCtrl(panel)
+        self.frag_list.Bind(wx.EVT_LIST_ITEM_ACTIVATED, self.on_frag_double_click)
+        self.frag_list.Bind(wx.EVT_LIST_ITEM_SELECTED, self.on_frag_click)
         self.frag_list.Bind(wx.EVT_CHAR_HOOK, self.on_frag_char_hook)
         self.frag_list.SetMinSize((0, -1))  # 👈 同样设置
         hbox_lists.Add(self.frag_list, proportion=1, flag=wx.EXPAND | wx.LEFT, border=6)
@@ -633,6 +2930,14 @@ class ShaderBrowser(wx.Frame):
         
         panel.SetSizer(vbox)
     
+    def on_keyword_filter_changed(self, event):
+        """处理关键字筛选框内容改变事件：按关键字筛选frag列表"""
+        keywords = self.keyword_filter_text.GetValue().split()
+        self.frag_list.set_keyword_filter(keywords)
+        if keywords:
+            self.status_bar.SetStatusText(
+                f"关键字筛选: {len(self.frag_list.records)}/{len(self.frag_list.all_records)} 个变体")
+    
     def on_file_double_click(self, event):
         """处理文件列表双击事件：全选所有项目"""
         # 获取列表中的所有项目数量
@@ -703,6 +3008,54 @@ class ShaderBrowser(wx.Frame):
             self.status_bar.SetStatusText(f"另存选项已{status}")
         except Exception as e:
             self.status_bar.SetStatusText(f"保存另存选项配置失败: {str(e)}")
+    
+    def on_prefetch_checkbox_changed(self, event):
+        """处理预编译复选框状态改变事件：保存配置并启动/停止后台预编译"""
+        try:
+            config = self.load_config()
+            config["prefetch_enabled"] = self.prefetch_checkbox.GetValue()
+            
+            with open(self.CONFIG_FILE, 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=2, ensure_ascii=False)
+            
+            if self.prefetch_checkbox.GetValue():
+                self.start_prefetch()
+                self.status_bar.SetStatusText("预编译已启用")
+            else:
+                self.cancel_prefetch()
+                self.status_bar.SetStatusText("预编译已禁用")
+        except Exception as e:
+            self.status_bar.SetStatusText(f"保存预编译选项配置失败: {str(e)}")
+    
+    def on_memory_checkbox_changed(self, event):
+        """处理仅分析复选框状态改变事件：保存配置"""
+        try:
+            config = self.load_config()
+            config["analysis_in_memory"] = self.memory_checkbox.GetValue()
+            
+            with open(self.CONFIG_FILE, 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=2, ensure_ascii=False)
+            
+            status = "启用（不写入Frags目录）" if self.memory_checkbox.GetValue() else "禁用"
+            self.status_bar.SetStatusText(f"仅分析模式已{status}")
+        except Exception as e:
+            self.status_bar.SetStatusText(f"保存仅分析选项配置失败: {str(e)}")
+    
+    def on_vertex_checkbox_changed(self, event):
+        """处理含顶点复选框状态改变事件：保存配置"""
+        self.extract_vertex = self.vertex_checkbox.GetValue()
+        try:
+            config = self.load_config()
+            config["extract_vertex"] = self.extract_vertex
+            
+            with open(self.CONFIG_FILE, 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=2, ensure_ascii=False)
+            
+            status = "启用（同时提取并编译 .vert）" if self.extract_vertex else "禁用"
+            self.status_bar.SetStatusText(f"顶点程序提取已{status}")
+        except Exception as e:
+            self.status_bar.SetStatusText(f"保存含顶点选项配置失败: {str(e)}")
+    
     def on_shader_checkbox_changed(self, event):
         """处理Shader复选框状态改变事件：勾选时只显示shader文件，取消勾选时显示所有文件"""
         try:
@@ -801,6 +3154,14 @@ class ShaderBrowser(wx.Frame):
                     shader_checkbox_enabled = config.get("shader_checkbox_enabled", True)
                     self.shader_checkbox.SetValue(shader_checkbox_enabled)
                     
+                    # 加载预编译复选框状态
+                    prefetch_enabled = config.get("prefetch_enabled", False)
+                    self.prefetch_checkbox.SetValue(prefetch_enabled)
+                    
+                    # 加载仅分析复选框状态
+                    analysis_in_memory = config.get("analysis_in_memory", False)
+                    self.memory_checkbox.SetValue(analysis_in_memory)
+                    
                     # 加载最后使用的路径
                     last_path = config.get("last_path", "")
                     if last_path and os.path.isdir(last_path):
@@ -912,73 +3273,33 @@ class ShaderBrowser(wx.Frame):
     def on_close_window(self, event):
         """主窗口关闭时保存窗口位置和大小，然后真正关闭。"""
         self.save_window_geometry()
+        self.cancel_prefetch()
+        self.temp_source_pool.cleanup()
+        if self.results_db is not None:
+            self.results_db.close()
         event.Skip()
         self.Destroy()
 
     def on_frag_click(self, event):
         """处理frag列表单击事件：计算并显示Longest Path Cycles总和"""
-        selection = self.frag_list.GetSelection()
+        selection = self.frag_list.get_selected_row()
         if selection == wx.NOT_FOUND:
             # 清空显示
             self.frag_sum_label.SetLabel("")
             self.instructions_label.SetLabel("")
             return
         
-        # 获取显示文本
-        display_text = self.frag_list.GetString(selection)
+        record = self.frag_list.get_record(selection)
         
-        # 检查是否已经包含复杂度和指令数信息
-        if " : (" in display_text and display_text.endswith(")"):
-            # 提取已有的复杂度和指令数信息
-            try:
-                # 提取括号内的内容，格式为 "(63-150)"
-                # 先找到 " : (" 的位置
-                split_pos = display_text.rfind(" : (")
-                if split_pos != -1:
-                    info_part = display_text[split_pos + 4:-1]  # 跳过 " : (" 并去掉最后的 ")"
-                    
-                    # 分割复杂度和指令数
-                    if "-" in info_part:
-                        parts = info_part.split("-")
-                        cycles_str = parts[0].strip()
-                        instructions_str = parts[1].strip()
-                        
-                        # 转换为数值
-                        current_cycles_sum = float(cycles_str)
-                        current_instructions = int(instructions_str)
-                        
-                        # 直接显示已有信息
-                        if current_cycles_sum.is_integer():
-                            display_cycles = f"复杂度:{int(current_cycles_sum)}"
-                        else:
-                            display_cycles = f"复杂度:{current_cycles_sum}"
-                        
-                        # 先设置标签文本
-                        self.frag_sum_label.SetLabel(display_cycles)
-                        self.instructions_label.SetLabel(f"指令数:{current_instructions}")
-                        
-                        # 然后根据当前复杂度设置颜色
-                        if current_cycles_sum <= 40:
-                            color = wx.Colour(0, 180, 0)  # 绿色
-                        elif current_cycles_sum <= 79:
-                            color = wx.Colour(255, 140, 0)  # 橙色
-                        else:
-                            color = wx.Colour(220, 0, 0)  # 红色
-                        
-                        self.frag_sum_label.SetForegroundColour(color)
-                        self.instructions_label.SetForegroundColour(wx.Colour(0, 100, 200))  # 蓝色
-                        
-                        # 强制刷新显示
-                        self.frag_sum_label.Refresh()
-                        self.instructions_label.Refresh()
-                        
-                        return  # 直接返回，不需要重新计算
-            except (ValueError, IndexError) as e:
-                # 如果解析失败，继续执行正常的计算流程
-                pass
+        # 以当前选中项为中心重新安排后台预编译
+        self.start_prefetch(selection)
+        
+        # 已有复杂度和指令数信息时直接显示，不需要重新计算
+        if record.has_metrics:
+            self.update_frag_sum_display(record.name, record.cycles_sum, record.instructions)
+            return
         
-        # 提取原始文件名
-        frag_file_name = self.extract_frag_filename(display_text)
+        frag_file_name = record.name
         
         current_path = self.path_combo.GetValue()
         if not current_path:
@@ -987,68 +3308,125 @@ class ShaderBrowser(wx.Frame):
             self.instructions_label.SetLabel("")
             return
         
-        # 构建frag文件的完整路径
+        # 构建frag文件的完整路径（内存分析模式下的变体没有对应文件）
         frags_dir = os.path.join(current_path, "Frags")
         frag_file_path = os.path.join(frags_dir, frag_file_name)
+        source = self.memory_variants.get(frag_file_name)
         
-        if not os.path.exists(frag_file_path):
+        if source is None and not os.path.exists(frag_file_path):
             self.frag_sum_label.SetLabel("文件不存在")
             self.frag_sum_label.SetForegroundColour(wx.Colour(0, 100, 200))  # 蓝色
             self.instructions_label.SetLabel("")
             return
         
-        # 查找malisc.exe
-        malisc_path = self.find_malisc_exe()
-        if not malisc_path:
+        # 查找编译器（malisc.exe 或配置的替身编译器）
+        backend = self.get_compiler_backend()
+        if not backend:
             self.frag_sum_label.SetLabel("未找到malisc.exe")
             self.frag_sum_label.SetForegroundColour(wx.Colour(0, 100, 200))  # 蓝色
             self.instructions_label.SetLabel("")
             return
         
-        # 在新线程中执行编译并计算总和
-        import threading
-        thread = threading.Thread(
-            target=self.calculate_frag_cycles_sum_in_thread,
-            args=(frag_file_name, frag_file_path, malisc_path)
+        # 交给编译调度器执行，交互查看优先于后台批量任务
+        self.compile_scheduler.submit(
+            self.calculate_frag_cycles_sum_in_thread, frag_file_name, frag_file_path, backend, source,
+            priority=CompileScheduler.PRIORITY_INTERACTIVE
         )
-        thread.daemon = True
-        thread.start()
         
         # 显示加载中状态
         self.frag_sum_label.SetLabel("计算中...")
         self.frag_sum_label.SetForegroundColour(wx.Colour(0, 100, 200))  # 蓝色
         self.instructions_label.SetLabel("")
     
-    def calculate_frag_cycles_sum_in_thread(self, frag_file_name, frag_file_path, malisc_path):
+    def calculate_frag_cycles_sum_in_thread(self, frag_file_name, frag_file_path, backend, source=None):
         """在新线程中编译frag文件并计算Longest Path Cycles总和和指令数"""
         try:
-            # 使用powershell执行malisc.exe
-            cmd = f'powershell -Command "& \'{malisc_path}\' \'{frag_file_path}\'"'
-            
-            # 执行命令
-            import subprocess
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True, encoding='utf-8')
+            # 编译（内容未变化时直接使用缓存结果）；流式模式下关键指标一解析出来就先显示
+            def on_metrics(metrics):
+                wx.CallAfter(self.update_frag_sum_display, frag_file_name,
+                             metrics.cycles_sum, metrics.instructions_emitted)
+            entry = self.compile_frag(backend, frag_file_path, source=source, on_metrics=on_metrics)
+            cycles_sum = entry["cycles_sum"]
+            instructions = entry["instructions"]
             
-            # 获取输出
-            output = result.stdout
-            if result.returncode != 0:
-                output += f"\n\n错误代码: {result.returncode}"
-                if result.stderr:
-                    output += f"\n错误信息: {result.stderr}"
-            
-            # 计算Longest Path Cycles总和
-            cycles_sum = self.calculate_longest_path_cycles_sum(output)
-            
-            # 提取Instructions Emitted值
-            instructions = self.extract_instructions_emitted(output)
-            
-            # 在主线程中更新显示
+            # 在主线程中记录指标并更新显示
+            wx.CallAfter(self.record_frag_metrics, frag_file_name, frag_file_path, entry)
             wx.CallAfter(self.update_frag_sum_display, frag_file_name, cycles_sum, instructions)
             
         except Exception as e:
             error_msg = f"计算失败: {str(e)}"
             wx.CallAfter(self.update_frag_sum_display, frag_file_name, None, None, error_msg)
     
+    def start_prefetch(self, center=None):
+        """在后台以低优先级预编译可见及相邻的变体（需勾选"预编译"）
+        center 为中心行号（通常是当前选中项，该行本身不预编译），为None时以可见区域为中心
+        """
+        self.cancel_prefetch()
+        if not self.prefetch_checkbox.GetValue():
+            return
+        
+        count = self.frag_list.GetItemCount()
+        current_path = self.path_combo.GetValue()
+        if count == 0 or not current_path:
+            return
+        
+        backend = self.get_compiler_backend()
+        if not backend:
+            return
+        
+        frags_dir = os.path.join(current_path, "Frags")
+        token = CompileCancelToken()
+        self.prefetch_token = token
+        
+        for row in self.get_prefetch_rows(count, center):
+            record = self.frag_list.get_record(row)
+            # 已有复杂度信息的变体无需预编译
+            if record.has_metrics:
+                continue
+            frag_file_name = record.name
+            frag_file_path = os.path.join(frags_dir, frag_file_name)
+            source = self.memory_variants.get(frag_file_name)
+            self.compile_scheduler.submit(
+                self.prefetch_frag_in_thread, frag_file_name, frag_file_path, backend, token, source,
+                priority=CompileScheduler.PRIORITY_PREFETCH
+            )
+    
+    def get_prefetch_rows(self, count, center=None, neighbours=20):
+        """计算需要预编译的行：先是可见行，再从中心向两侧扩展 neighbours 行"""
+        try:
+            top = self.frag_list.GetTopItem()
+            per_page = self.frag_list.GetCountPerPage()
+        except Exception:
+            top, per_page = 0, 30
+        
+        if center is None:
+            center = top + per_page // 2
+        
+        rows = [row for row in range(top, min(top + per_page, count)) if row != center]
+        seen = set(rows)
+        seen.add(center)
+        for offset in range(1, neighbours + 1):
+            for row in (center + offset, center - offset):
+                if 0 <= row < count and row not in seen:
+                    seen.add(row)
+                    rows.append(row)
+        return rows
+    
+    def cancel_prefetch(self):
+        """停止后台预编译：丢弃排队中的任务并终止进行中的编译"""
+        if self.prefetch_token is not None:
+            self.prefetch_token.cancel()
+            self.prefetch_token = None
+    
+    def prefetch_frag_in_thread(self, frag_file_name, frag_file_path, backend, cancel_token, source=None):
+        """在编译调度器的工作线程中预编译frag文件，完成后在列表中补上复杂度信息"""
+        try:
+            entry = self.compile_frag(backend, frag_file_path, cancel_token=cancel_token, source=source)
+        except (CompileCancelled, OSError):
+            return
+        
+        wx.CallAfter(self.record_frag_metrics, frag_file_name, frag_file_path, entry)
+    
     def update_frag_sum_display(self, frag_file_name, cycles_sum, instructions=None, error_msg=None):
         """更新frag总和显示和指令数显示"""
         if error_msg:
@@ -1063,10 +3441,8 @@ class ShaderBrowser(wx.Frame):
             # 检查是否为整数：如果cycles_sum与它的整数部分相等，则为整数
             if cycles_sum.is_integer():
                 display_text = f"复杂度:{int(cycles_sum)}"
-                cycles_str = str(int(cycles_sum))
             else:
                 display_text = f"复杂度:{cycles_sum}"
-                cycles_str = str(cycles_sum)
             
             # 根据当前复杂度设置frag_sum_label的颜色
             if cycles_sum <= 40:
@@ -1098,10 +3474,6 @@ class ShaderBrowser(wx.Frame):
                 else:
                     self.max_frag_sum_value.SetForegroundColour(wx.Colour(220, 0, 0))  # 红色
             
-            # 更新列表项显示名称，添加复杂度和指令数信息
-            if instructions is not None:
-                display_name = f"{frag_file_name} : ({cycles_str}-{instructions})"
-                self.update_frag_list_item(frag_file_name, display_name)
         else:
             display_text = "--"
             self.frag_sum_label.SetForegroundColour(wx.Colour(0, 100, 200))  # 蓝色
@@ -1131,82 +3503,6 @@ class ShaderBrowser(wx.Frame):
         else:
             self.instructions_label.SetLabel("")
     
-    def calculate_longest_path_cycles_sum(self, output):
-        """计算Longest Path Cycles三个值的和（与CompileResultDialog中的方法相同）"""
-        try:
-            # 查找"Longest Path Cycles:"在文本中的位置
-            lines = output.split('\n')
-            for line in lines:
-                if "Longest Path Cycles:" in line:
-                    # 提取冒号后面的部分
-                    parts = line.split("Longest Path Cycles:")
-                    if len(parts) > 1:
-                        values_str = parts[1].strip()
-                        
-                        # 提取所有数字（可能用逗号、空格分隔，包括小数）
-                        import re
-                        # 匹配整数和小数，例如：1.7, 2, 0.5, 3.14
-                        # 改进：只匹配紧跟在"Longest Path Cycles:"后面的数字
-                        # 格式通常是: Longest Path Cycles: 1.7, 2, 0.5
-                        numbers = re.findall(r'\d+\.?\d*', values_str)
-                        
-                        if len(numbers) >= 3:
-                            # 取前三个数字
-                            try:
-                                num1 = float(numbers[0])
-                                num2 = float(numbers[1])
-                                num3 = float(numbers[2])
-                                return num1 + num2 + num3
-                            except ValueError:
-                                return None
-                        else:
-                            # 尝试其他格式，比如用逗号分隔
-                            # 格式: Longest Path Cycles: 1.7,2,0.5
-                            values_str = values_str.replace(',', ' ')
-                            numbers = re.findall(r'\d+\.?\d*', values_str)
-                            if len(numbers) >= 3:
-                                try:
-                                    num1 = float(numbers[0])
-                                    num2 = float(numbers[1])
-                                    num3 = float(numbers[2])
-                                    return num1 + num2 + num3
-                                except ValueError:
-                                    return None
-            return None
-        except Exception as e:
-            # 将控制台错误改为状态栏提示
-            wx.CallAfter(self.status_bar.SetStatusText, f"计算Longest Path Cycles总和时出错: {str(e)[:50]}...")
-            return None
-    
-    def extract_instructions_emitted(self, output):
-        """提取Instructions Emitted字段的值"""
-        try:
-            # 查找"Instructions Emitted:"在文本中的位置
-            lines = output.split('\n')
-            for line in lines:
-                if "Instructions Emitted:" in line:
-                    # 提取冒号后面的部分
-                    parts = line.split("Instructions Emitted:")
-                    if len(parts) > 1:
-                        values_str = parts[1].strip()
-                        
-                        # 提取第一个数字（可能用逗号、空格分隔）
-                        import re
-                        # 匹配整数，例如：12, 45, 100
-                        numbers = re.findall(r'\d+', values_str)
-                        
-                        if numbers:
-                            # 取第一个数字
-                            try:
-                                return int(numbers[0])
-                            except ValueError:
-                                return None
-            return None
-        except Exception as e:
-            # 将控制台错误改为状态栏提示
-            wx.CallAfter(self.status_bar.SetStatusText, f"提取Instructions Emitted时出错: {str(e)[:50]}...")
-            return None
-    
     def on_key_press(self, event):
         """处理键盘事件：F1键显示帮助"""
         keycode = event.GetKeyCode()
@@ -1236,31 +3532,30 @@ class ShaderBrowser(wx.Frame):
     
     def on_frag_double_click(self, event):
         """处理frag列表双击事件：使用malisc.exe编译选中的frag文件"""
-        selection = self.frag_list.GetSelection()
+        selection = self.frag_list.get_selected_row()
         if selection == wx.NOT_FOUND:
             wx.MessageBox("请先在右侧列表中选择一个.frag文件", "提示", wx.OK | wx.ICON_WARNING)
             return
         
-        # 获取显示文本并提取原始文件名
-        display_text = self.frag_list.GetString(selection)
-        frag_file_name = self.extract_frag_filename(display_text)
+        frag_file_name = self.frag_list.get_record(selection).name
         
         current_path = self.path_combo.GetValue()
         if not current_path:
             wx.MessageBox("请先选择或输入路径", "提示", wx.OK | wx.ICON_WARNING)
             return
         
-        # 构建frag文件的完整路径
+        # 构建frag文件的完整路径（内存分析模式下的变体没有对应文件）
         frags_dir = os.path.join(current_path, "Frags")
         frag_file_path = os.path.join(frags_dir, frag_file_name)
+        source = self.memory_variants.get(frag_file_name)
         
-        if not os.path.exists(frag_file_path):
+        if source is None and not os.path.exists(frag_file_path):
             wx.MessageBox(f"文件不存在: {frag_file_path}", "错误", wx.OK | wx.ICON_ERROR)
             return
         
-        # 查找malisc.exe
-        malisc_path = self.find_malisc_exe()
-        if not malisc_path:
+        # 查找编译器（malisc.exe 或配置的替身编译器）
+        backend = self.get_compiler_backend()
+        if not backend:
             wx.MessageBox(
                 "未找到 malisc.exe\n"
                 "请确保 Mali_Offline_Compiler_Windows 目录存在且包含 malisc.exe",
@@ -1268,34 +3563,21 @@ class ShaderBrowser(wx.Frame):
             )
             return
         
-        # 在新线程中执行编译，避免界面卡顿
-        import threading
-        thread = threading.Thread(
-            target=self.compile_frag_in_thread,
-            args=(frag_file_name, frag_file_path, malisc_path)
+        # 交给编译调度器执行（避免界面卡顿），交互查看优先于后台批量任务
+        self.compile_scheduler.submit(
+            self.compile_frag_in_thread, frag_file_name, frag_file_path, backend, source,
+            priority=CompileScheduler.PRIORITY_INTERACTIVE
         )
-        thread.daemon = True
-        thread.start()
     
-    def compile_frag_in_thread(self, frag_file_name, frag_file_path, malisc_path):
+    def compile_frag_in_thread(self, frag_file_name, frag_file_path, backend, source=None):
         """在新线程中编译frag文件并显示结果"""
         try:
-            # 使用powershell执行malisc.exe
-            cmd = f'powershell -Command "& \'{malisc_path}\' \'{frag_file_path}\'"'
-            
             # 在主线程中更新状态栏
             wx.CallAfter(self.status_bar.SetStatusText, f"正在编译: {frag_file_name}")
             
-            # 执行命令
-            import subprocess
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True, encoding='utf-8')
-            
-            # 显示结果
-            output = result.stdout
-            if result.returncode != 0:
-                output += f"\n\n错误代码: {result.returncode}"
-                if result.stderr:
-                    output += f"\n错误信息: {result.stderr}"
+            # 编译（内容未变化时直接使用缓存中的完整输出）
+            entry = self.compile_frag(backend, frag_file_path, source=source)
+            output = entry["output"]
             
             # 在主线程中创建和显示非模态对话框
             wx.CallAfter(self.show_compile_result, frag_file_name, output)
@@ -1348,7 +3630,7 @@ class ShaderBrowser(wx.Frame):
             os.path.join(os.getcwd(), "Mali_Offline_Compiler_Windows", "malisc.exe"),
             # 在应用程序目录下的Mali_Offline_Compiler_Windows目录
             os.path.join(os.path.dirname(os.path.abspath(__file__)), "Mali_Offline_Compiler_Windows", "malisc.exe"),
-            # 在系统PATH中
+            # 在当前目录中
             "malisc.exe",
         ]
         
@@ -1356,6 +3638,28 @@ class ShaderBrowser(wx.Frame):
             if os.path.exists(path):
                 return os.path.abspath(path)
         
+        # 在系统PATH中
+        path = shutil.which("malisc")
+        if path:
+            return os.path.abspath(path)
+        
+        return None
+    
+    def get_compiler_backend(self):
+        """获取编译器调用后端
+        优先使用替身编译器（环境变量 SHADERTOOL_COMPILER 或配置项 compiler_script），
+        否则使用找到的malisc.exe；都找不到时返回None
+        """
+        script_path = os.environ.get("SHADERTOOL_COMPILER") or self.load_config().get("compiler_script")
+        if script_path:
+            if os.path.exists(script_path):
+                return ScriptBackend(script_path)
+            wx.CallAfter(self.status_bar.SetStatusText, f"替身编译器不存在: {script_path}")
+            return None
+        
+        malisc_path = self.find_malisc_exe()
+        if malisc_path:
+            return CompilerBackend([malisc_path], malisc_path)
         return None
     
     def del_comment(self, event):
@@ -1693,10 +3997,11 @@ class ShaderBrowser(wx.Frame):
         
         return header_end
     
-    def remove_comments_from_content(self, content):
+    def remove_comments_from_content(self, content, replacement=''):
         """
         从内容中移除所有注释（不保留任何注释）
         这是原始的 remove_comments 函数的逻辑
+        replacement 为多行注释替换成的文本（默认直接删除）
         """
         if not content:
             return content
@@ -1786,6 +4091,7 @@ class ShaderBrowser(wx.Frame):
                 # 在多行注释中，检查是否结束
                 if in_multi_comment and char == '*' and next_char == '/':
                     in_multi_comment = False
+                    result.append(replacement)
                     i += 2
                     continue
             
@@ -1918,6 +4224,7 @@ class ShaderBrowser(wx.Frame):
         self.max_instructions_value.SetForegroundColour(wx.Colour(0, 100, 200))  # 重置为蓝色
         self.max_cycles_sum = 0
         self.max_instructions = 0
+        self.cancel_prefetch()
         try:
             self.status_bar.SetStatusText("正在刷新文件列表...")
             self.load_shader_files(current_path)
@@ -1955,8 +4262,25 @@ class ShaderBrowser(wx.Frame):
                 self.status_bar.SetStatusText("历史记录已清空")
                 # wx.MessageBox("历史记录已成功清空", "完成", wx.OK | wx.ICON_INFORMATION)
             except Exception as e:
-                self.status_bar.SetStatusText(f"清空历史记录失败: {str(e)}")
-                wx.MessageBox(f"清空历史记录失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
+                self.status_bar.SetStatusText(f"清空历史记录失败: {str(e)}")
+                wx.MessageBox(f"清空历史记录失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
+        
+        dlg.Destroy()
+    
+    def on_clear_cache(self, event):
+        """处理清除缓存按钮点击事件：清空编译结果缓存"""
+        dlg = wx.MessageDialog(self,
+                              "确定要清空编译结果缓存吗？\n之后的分析会重新调用malisc编译。",
+                              "确认清除缓存",
+                              wx.YES_NO | wx.NO_DEFAULT | wx.ICON_QUESTION)
+        
+        if dlg.ShowModal() == wx.ID_YES:
+            try:
+                removed = self.compile_cache.clear()
+                self.status_bar.SetStatusText(f"已清除 {removed} 条编译缓存")
+            except Exception as e:
+                self.status_bar.SetStatusText(f"清除编译缓存失败: {str(e)}")
+                wx.MessageBox(f"清除编译缓存失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
         
         dlg.Destroy()
     
@@ -1995,40 +4319,141 @@ class ShaderBrowser(wx.Frame):
         
         dlg.Destroy()
         
-        success_count = 0
-        error_count = 0
-        error_messages = []
-        total_frag_files = 0
+        # 前台操作开始，停止后台预编译
+        self.cancel_prefetch()
         
-        # 处理每个选中的文件
+        # 在新线程中分离，避免界面卡顿；可取消（已开始分离的shader会完成）
+        cancel_token = CompileCancelToken()
+        self.show_progress_dialog(len(file_names), cancel_token.cancel, title="分离frag")
+        thread = threading.Thread(
+            target=self.separate_frag_in_thread,
+            args=(file_names, current_path, cancel_token)
+        )
+        thread.daemon = True
+        thread.start()
+    
+    def separate_frag_in_thread(self, file_names, current_path, cancel_token):
+        """在新线程中分离选中的shader，结束后在主线程中刷新列表并显示结果"""
+        def on_progress(completed, total, file_name):
+            wx.CallAfter(self.update_progress, completed, total, f"已分离: {file_name}")
+        
+        try:
+            results = self.separate_shaders(file_names, current_path, cancel_token, on_progress)
+        except Exception as e:
+            results = [(file_name, None, str(e), False) for file_name in file_names]
+        wx.CallAfter(self.finish_separate_frag, current_path, results, cancel_token.cancelled)
+    
+    def separate_shaders(self, file_names, current_path, cancel_token=None, on_progress=None):
+        """分离多个shader文件的frag变体到 current_path/Frags
+        Frags 目录中的清单（FragManifest）记录上次分离的结果：没有变化的shader直接跳过，
+        变化的shader重新分离并删除不再产生的旧变体。
+        多个文件需要分离时在进程池中并行（分离是纯Python的CPU密集任务，线程无法利用多核）。
+        取消时不再开始新的文件，已开始的文件会完成。
+        返回 [(文件名, frag文件名列表 或 None, 错误信息 或 None, 是否跳过), ...]，已取消的文件不在其中
+        """
+        manifest = FragManifest(os.path.join(current_path, "Frags"))
+        include_vertex = self.extract_vertex
+        results = []
+        shader_paths = {}
         for file_name in file_names:
+            shader_path = os.path.join(current_path, file_name)
+            if not os.path.exists(shader_path):
+                results.append((file_name, None, f"文件不存在: {shader_path}", False))
+                continue
             try:
-                shader_path = os.path.join(current_path, file_name)
-                
-                if not os.path.exists(shader_path):
-                    error_messages.append(f"文件不存在: {shader_path}")
-                    error_count += 1
-                    continue
-                
-                # 分离frag
-                frag_files = self.separate_frag_from_shader(shader_path, current_path)
-                
-                if frag_files:
-                    success_count += 1
-                    total_frag_files += len(frag_files)
-                else:
-                    error_messages.append(f"{file_name}: 未找到可分离的frag内容")
-                    error_count += 1
-                    
+                variants = manifest.unchanged_variants(file_name, shader_path, include_vertex)
+            except OSError as e:
+                results.append((file_name, None, str(e), False))
+                continue
+            if variants is not None:
+                results.append((file_name, variants, None, True))
+            else:
+                shader_paths[file_name] = shader_path
+        
+        total = len(file_names)
+        completed = len(results)
+        if on_progress and results:
+            on_progress(completed, total, results[-1][0])
+        
+        def add_result(file_name, get_entry):
+            nonlocal completed
+            try:
+                entry = get_entry()
+                manifest.update(file_name, entry)
+                results.append((file_name, entry["variants"], None, False))
             except Exception as e:
-                error_messages.append(f"{file_name}: {str(e)}")
+                results.append((file_name, None, str(e), False))
+            completed += 1
+            if on_progress:
+                on_progress(completed, total, file_name)
+        
+        workers = min(len(shader_paths), self.separate_processes or os.cpu_count() or 1)
+        try:
+            if workers <= 1:
+                for file_name, shader_path in shader_paths.items():
+                    if cancel_token is not None and cancel_token.cancelled:
+                        break
+                    add_result(file_name, lambda: FragmentSplitter.separate_incremental(
+                        shader_path, current_path, manifest.previous_variants(file_name), include_vertex))
+                return results
+            
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                future_to_name = {
+                    executor.submit(FragmentSplitter.separate_incremental, shader_path, current_path,
+                                    manifest.previous_variants(file_name), include_vertex): file_name
+                    for file_name, shader_path in shader_paths.items()
+                }
+                for future in concurrent.futures.as_completed(future_to_name):
+                    if cancel_token is not None and cancel_token.cancelled:
+                        for pending in future_to_name:
+                            pending.cancel()
+                    if future.cancelled():
+                        continue
+                    add_result(future_to_name[future], future.result)
+            return results
+        finally:
+            # 清单只在当前线程中写入，取消或出错时也保存已完成的部分
+            try:
+                manifest.save()
+            except OSError as e:
+                print(f"保存分离清单失败: {e}")
+    
+    def finish_separate_frag(self, current_path, results, cancelled):
+        """分离结束后刷新frag列表并显示结果（在主线程中调用）"""
+        self.close_progress_dialog()
+        
+        success_count = 0
+        skipped_count = 0
+        error_count = 0
+        error_messages = []
+        total_frag_files = 0
+        total_vert_files = 0
+        for file_name, frag_files, error, skipped in results:
+            if error is not None:
+                error_messages.append(f"{file_name}: {error}")
+                error_count += 1
+            elif frag_files:
+                success_count += 1
+                vert_files = sum(1 for frag_file in frag_files if frag_file.endswith(".vert"))
+                total_frag_files += len(frag_files) - vert_files
+                total_vert_files += vert_files
+                if skipped:
+                    skipped_count += 1
+            else:
+                error_messages.append(f"{file_name}: 未找到可分离的frag内容")
                 error_count += 1
         
         # 更新右侧frag列表
         self.load_frag_files(current_path)
+        self.start_prefetch()
         
         # 显示处理结果
-        result_message = f"分离frag完成！\n成功: {success_count} 个文件\n失败: {error_count} 个文件\n总共分离出: {total_frag_files} 个frag文件"
+        title = "分离frag已取消" if cancelled else "分离frag完成"
+        result_message = f"{title}！\n成功: {success_count} 个文件\n失败: {error_count} 个文件\n总共分离出: {total_frag_files} 个frag文件"
+        if total_vert_files:
+            result_message += f"\n配对的顶点程序: {total_vert_files} 个vert文件"
+        if skipped_count:
+            result_message += f"\n（其中 {skipped_count} 个文件自上次分离后没有变化，已跳过）"
         
         if error_messages:
             result_message += f"\n\n错误详情:\n" + "\n".join(error_messages)
@@ -2037,21 +4462,19 @@ class ShaderBrowser(wx.Frame):
         
         # 更新状态栏
         if error_count == 0:
-            self.status_bar.SetStatusText(f"分离frag完成，成功处理 {success_count} 个文件，分离出 {total_frag_files} 个frag文件")
+            self.status_bar.SetStatusText(f"{title}，成功处理 {success_count} 个文件，分离出 {total_frag_files} 个frag文件")
         else:
-            self.status_bar.SetStatusText(f"分离frag完成，成功 {success_count} 个，失败 {error_count} 个")
+            self.status_bar.SetStatusText(f"{title}，成功 {success_count} 个，失败 {error_count} 个")
     
     def on_open_frag(self, event):
         """处理打开变体按钮点击事件：使用系统默认程序打开选中的frag文件"""
         # 获取选中的frag文件
-        selection = self.frag_list.GetSelection()
+        selection = self.frag_list.get_selected_row()
         if selection == wx.NOT_FOUND:
             wx.MessageBox("请先在右侧列表中选择一个.frag文件", "提示", wx.OK | wx.ICON_WARNING)
             return
         
-        # 获取显示文本并提取原始文件名
-        display_text = self.frag_list.GetString(selection)
-        frag_file_name = self.extract_frag_filename(display_text)
+        frag_file_name = self.frag_list.get_record(selection).name
         
         current_path = self.path_combo.GetValue()
         if not current_path:
@@ -2063,6 +4486,11 @@ class ShaderBrowser(wx.Frame):
         frag_file_path = os.path.join(frags_dir, frag_file_name)
         
         if not os.path.exists(frag_file_path):
+            if frag_file_name in self.memory_variants:
+                wx.MessageBox(f"{frag_file_name} 是仅分析模式下的内存变体，没有对应的文件\n"
+                              "请取消勾选\"仅分析\"后重新查找，或使用\"分离frag\"生成文件",
+                              "提示", wx.OK | wx.ICON_INFORMATION)
+                return
             wx.MessageBox(f"文件不存在: {frag_file_path}", "错误", wx.OK | wx.ICON_ERROR)
             return
         
@@ -2084,143 +4512,30 @@ class ShaderBrowser(wx.Frame):
             wx.MessageBox(f"打开文件失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
     
     def separate_frag_from_shader(self, shader_path, base_directory):
-        """从shader文件中分离frag内容"""
-        if not os.path.exists(shader_path):
-            raise FileNotFoundError(f"文件不存在: {shader_path}")
-        
-        # 读取文件内容
-        with open(shader_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        # 查找所有 #ifdef FRAGMENT 的位置
-        fragment_indices = []
-        for i, line in enumerate(lines):
-            if '#ifdef FRAGMENT' in line:
-                # 检查下一行是否包含 '#version X es'格式（X为数字）
-                if i + 1 < len(lines):
-                    next_line = lines[i + 1].strip()
-                    # 使用正则表达式匹配 #version 数字 es 格式
-                    import re
-                    if re.search(r'#version\s+\d+\s+es', next_line):
-                        fragment_indices.append(i)
-        
-        if len(fragment_indices) < 1:
-            return []  # 至少需要一个 #ifdef FRAGMENT 才能分割
-        
-        # 创建Frags目录
-        frags_dir = os.path.join(base_directory, "Frags")
-        os.makedirs(frags_dir, exist_ok=True)
-        
-        # 获取shader文件名（不含扩展名）
-        shader_name = os.path.splitext(os.path.basename(shader_path))[0]
-        
-        frag_files = []
-        
-        # 如果有多个fragment块，分割每个fragment块
-        if len(fragment_indices) >= 2:
-            for i in range(len(fragment_indices) - 1):
-                start_idx = fragment_indices[i]
-                end_idx = fragment_indices[i + 1]
-                
-                # 提取fragment内容（从start_idx到end_idx-1）
-                fragment_content = lines[start_idx:end_idx]
-                
-                # 处理文本：移除第一行的 #ifdef FRAGMENT 和最后的 #endif
-                processed_content = self.process_fragment_content(fragment_content)
-                
-                # 生成文件名
-                frag_filename = f"{shader_name}_{i+1:03d}.frag"
-                frag_filepath = os.path.join(frags_dir, frag_filename)
-                
-                # 写入文件
-                with open(frag_filepath, 'w', encoding='utf-8') as f:
-                    f.writelines(processed_content)
-                
-                frag_files.append(frag_filename)
-        
-        # 处理最后一个fragment块（到文件结尾）
-        if fragment_indices:
-            start_idx = fragment_indices[-1]
-            fragment_content = lines[start_idx:]
-            
-            # 处理文本：移除第一行的 #ifdef FRAGMENT 和最后的 #endif
-            processed_content = self.process_fragment_content(fragment_content)
-            
-            # 生成文件名：如果只有一个fragment，使用001作为编号
-            if len(fragment_indices) == 1:
-                frag_filename = f"{shader_name}_001.frag"
-            else:
-                frag_filename = f"{shader_name}_{len(fragment_indices):03d}.frag"
-                
-            frag_filepath = os.path.join(frags_dir, frag_filename)
-            
-            with open(frag_filepath, 'w', encoding='utf-8') as f:
-                f.writelines(processed_content)
-            
-            frag_files.append(frag_filename)
-        
-        return frag_files
+        """从shader文件中分离frag内容，写入 base_directory/Frags 目录，返回写入的文件名列表"""
+        return FragmentSplitter.separate(shader_path, base_directory, self.extract_vertex)
     
-    def process_fragment_content(self, content_lines):
-        """处理fragment内容：移除标记、修改版本号并按分隔线分割"""
-        if not content_lines:
-            return []
-        
-        # 创建副本以避免修改原始列表
-        processed = content_lines.copy()
-        
-        # 1. 移除第一行的 #ifdef FRAGMENT（如果存在）
-        if processed and '#ifdef FRAGMENT' in processed[0]:
-            processed = processed[1:]
-        
-        # 2. 查找分隔线 "//////////////////////////////////////////////////////"
-        separator_line = "//////////////////////////////////////////////////////"
-        separator_index = -1
-        
-        for i, line in enumerate(processed):
-            if separator_line in line:
-                separator_index = i
-                break
-        
-        # 3. 如果找到分隔线，只保留分隔线之前的内容
-        if separator_index != -1:
-            processed = processed[:separator_index]
-        
-        # 4. 移除最后一行的 #endif（如果存在）及其后面的空行
-        # 从后往前查找 #endif
-        endif_index = -1
-        for i in range(len(processed) - 1, -1, -1):
-            if '#endif' in processed[i]:
-                endif_index = i
-                break
-        
-        if endif_index != -1:
-            # 移除 #endif 行
-            processed = processed[:endif_index]
-            
-            # 移除 #endif 后面的空行（从后往前移除连续的空行）
-            while processed and processed[-1].strip() == '':
-                processed = processed[:-1]
-        
-        # 5. 修改所有 #version X es 为 #version 320 es（X为任意数字）
-        import re
-        for i in range(len(processed)):
-            # 使用正则表达式匹配 #version 数字 es 格式
-            if re.search(r'#version\s+\d+\s+es', processed[i]):
-                # 将版本号替换为320
-                processed[i] = re.sub(r'#version\s+\d+\s+es', '#version 320 es', processed[i])
-        
-        return processed
+    def extract_fragment_variants(self, shader_path, keywords=None):
+        """从shader文件中提取所有frag变体（只在内存中处理，不写文件）
+        返回 [(frag文件名, frag内容), ...]，勾选"含顶点"时包括配对的 .vert
+        keywords 为字典时填入每个frag变体的关键字
+        """
+        return FragmentSplitter.extract(shader_path, self.extract_vertex, keywords)
     
     def load_frag_files(self, directory):
         """加载指定目录下Frags文件夹中的所有.frag文件"""
-        self.frag_list.Clear()
+        self.set_frag_rows(directory, [])
+        # 重新从磁盘加载时丢弃内存分析模式下的变体
+        self.memory_variants = {}
         
         frags_dir = os.path.join(directory, "Frags")
         if not os.path.isdir(frags_dir):
             self.status_bar.SetStatusText(f"Frags目录不存在: {frags_dir}")
             return
         
+        # 变体的关键字从分离清单中读取
+        self.variant_keywords = FragManifest(frags_dir).variant_keywords()
+        
         try:
             # 获取所有 .frag 文件
             frag_files = []
@@ -2234,7 +4549,7 @@ class ShaderBrowser(wx.Frame):
             
             if frag_files:
                 frag_files.sort()  # 按字母顺序排序
-                self.frag_list.Set(frag_files)
+                self.set_frag_rows(directory, frag_files)
                 self.status_bar.SetStatusText(f"找到 {len(frag_files)} 个.frag文件")
             else:
                 self.status_bar.SetStatusText("未找到.frag文件")
@@ -2242,6 +4557,17 @@ class ShaderBrowser(wx.Frame):
         except Exception as e:
             self.status_bar.SetStatusText(f"加载frag文件失败: {str(e)}")
     
+    def show_memory_variants(self, memory_variants, variant_keywords):
+        """在frag列表中显示内存分析模式下提取的变体（没有对应的Frags文件）"""
+        self.memory_variants = memory_variants
+        self.variant_keywords = variant_keywords
+        frag_files = sorted(name for name in memory_variants if name.endswith(".frag"))
+        self.set_frag_rows(self.path_combo.GetValue(), frag_files)
+        if frag_files:
+            self.status_bar.SetStatusText(f"已在内存中提取 {len(frag_files)} 个frag变体（未写入Frags目录）")
+        else:
+            self.status_bar.SetStatusText("未找到可分离的frag内容")
+    
     def on_findHighest_frag(self, event):
         """处理最高复杂度按钮点击事件：找到选中shader的最高复杂度变体"""
         # 获取选中的shader文件（多项选择）
@@ -2277,128 +4603,150 @@ class ShaderBrowser(wx.Frame):
         
         dlg.Destroy()
         
+        # 前台批量任务开始，停止后台预编译
+        self.cancel_prefetch()
+        
         # 在新线程中执行查找，避免界面卡顿
         import threading
         thread = threading.Thread(
             target=self.find_highest_frag_in_thread,
-            args=(file_names, current_path)
+            args=(file_names, current_path, self.memory_checkbox.GetValue())
         )
         thread.daemon = True
         thread.start()
 
-    def find_highest_frag_in_thread(self, file_names, current_path):
-        """在新线程中查找最高复杂度变体"""
+    def find_highest_frag_in_thread(self, file_names, current_path, in_memory=False):
+        """在新线程中查找最高复杂度变体
+        in_memory 为 True 时只做分析：变体保存在内存中，不写入Frags目录
+        """
         try:
             # 在主线程中更新状态栏
             wx.CallAfter(self.status_bar.SetStatusText, f"正在查找最高复杂度变体...")
             
-            # 查找malisc.exe
-            malisc_path = self.find_malisc_exe()
-            if not malisc_path:
+            # 查找编译器（malisc.exe 或配置的替身编译器）
+            backend = self.get_compiler_backend()
+            if not backend:
                 wx.CallAfter(self.status_bar.SetStatusText, "未找到malisc.exe")
                 wx.CallAfter(wx.MessageBox, 
                     "未找到 malisc.exe\n请确保 Mali_Offline_Compiler_Windows 目录存在且包含 malisc.exe",
                     "错误", wx.OK | wx.ICON_ERROR)
                 return
             
-            # 检查Frags目录是否存在
-            frags_dir = os.path.join(current_path, "Frags")
-            need_separate = False
-            
-            # 检查每个选中的shader文件是否有对应的frag文件
-            for file_name in file_names:
-                shader_name = os.path.splitext(file_name)[0]
-                # 检查是否有以shader_name开头的frag文件
-                if os.path.exists(frags_dir):
-                    # 使用更精确的匹配：frag文件名必须以shader_name + "_"开头，并且以数字编号结尾
-                    import re
-                    pattern = re.compile(rf'^{re.escape(shader_name)}_\d{{3}}\.frag$', re.IGNORECASE)
-                    frag_files = [f for f in os.listdir(frags_dir) 
-                                 if pattern.match(f)]
-                    if not frag_files:
-                        need_separate = True
-                        break
-                else:
-                    need_separate = True
-                    break
-            
-            # 如果需要分离变体，先分离
-            if need_separate:
-                wx.CallAfter(self.status_bar.SetStatusText, "正在分离frag变体...")
-                for file_name in file_names:
-                    shader_path = os.path.join(current_path, file_name)
-                    if os.path.exists(shader_path):
-                        self.separate_frag_from_shader(shader_path, current_path)
-            
-            # 刷新frag列表
-            wx.CallAfter(self.load_frag_files, current_path)
-            
-            # 收集所有需要处理的frag文件
-            frag_files_to_process = []
-            if os.path.exists(frags_dir):
-                for file_name in file_names:
-                    shader_name = os.path.splitext(file_name)[0]
-                    # 查找所有以shader_name开头的frag文件
-                    # 使用更精确的匹配：frag文件名必须以shader_name + "_"开头，并且以数字编号结尾
-                    import re
-                    pattern = re.compile(rf'^{re.escape(shader_name)}_\d{{3}}\.frag$', re.IGNORECASE)
-                    for frag_file in os.listdir(frags_dir):
-                        if pattern.match(frag_file):
-                            frag_file_path = os.path.join(frags_dir, frag_file)
-                            frag_files_to_process.append((frag_file, frag_file_path))
+            # 收集要分析的变体（需要时先分离，或在内存中提取）
+            frag_files_to_process, memory_variants, variant_keywords = self.collect_batch_variants(
+                file_names, current_path, in_memory)
             
             if not frag_files_to_process:
                 wx.CallAfter(self.update_highest_frag_display, 0, 0, "")
                 wx.CallAfter(self.status_bar.SetStatusText, "未找到对应的frag变体文件")
                 return
             
-            # 创建进度对话框
-            wx.CallAfter(self.show_progress_dialog, len(frag_files_to_process))
+            # 勾选"含顶点"时同时编译与frag配对的顶点程序
+            vertex_files = (self.paired_vertex_files(frag_files_to_process, memory_variants)
+                            if self.extract_vertex else [])
+            
+            # 创建进度对话框（可取消：取消时终止进行中的编译，保留已完成的结果）
+            cancel_token = CompileCancelToken()
+            total = len(frag_files_to_process) + len(vertex_files)
+            wx.CallAfter(self.show_progress_dialog, total, cancel_token.cancel)
+            
+            # 热点统计：随结果到达增量维护最差的前 K 个变体和各shader的汇总
+            hot_list = HotListTracker(self.hot_list_size)
+            # frag的编译结果 [(frag文件名, 内容哈希, 结果)] 和顶点程序的编译结果 {frag文件名: 结果}，
+            # 全部完成后合并为写入结果数据库的行
+            fragment_results = []
+            vertex_entries = {}
             
-            # 查找所有相关frag文件的最高复杂度
-            max_cycles_sum = 0
-            max_instructions = 0
-            max_frag_file = ""
+            # 按内容分组：内容完全相同的变体只编译一次（frag和顶点程序分别分组）
+            variant_groups = self.group_variants_by_content(frag_files_to_process, memory_variants)
+            vertex_groups = self.group_variants_by_content(vertex_files, memory_variants)
             
-            for i, (frag_file, frag_file_path) in enumerate(frag_files_to_process):
-                # 更新进度
-                wx.CallAfter(self.update_progress, i, len(frag_files_to_process), f"正在处理: {frag_file}")
+            # 提交到共享的编译调度器并发编译（编译在子进程中进行，线程只负责等待结果）
+            completed = 0
+            
+            # 缓存命中的次数（与去重节省的次数一起统计为避免的编译次数）
+            cache_hits = 0
+            timed_out = 0
+            
+            future_to_group = {}
+            for content_hash, members in variant_groups.items():
+                frag_file, frag_file_path = members[0]
+                source = memory_variants.get(frag_file) if memory_variants is not None else None
+                future = self.compile_scheduler.submit(
+                    self.compile_frag, backend, frag_file_path, content_hash, cancel_token, source,
+                    priority=CompileScheduler.PRIORITY_BATCH
+                )
+                future_to_group[future] = (content_hash, members)
+            vertex_futures = set()
+            for content_hash, members in vertex_groups.items():
+                vert_file, vert_file_path = members[0]
+                source = memory_variants.get(vert_file) if memory_variants is not None else None
+                future = self.compile_scheduler.submit(
+                    self.compile_frag, backend, vert_file_path, content_hash, cancel_token, source,
+                    priority=CompileScheduler.PRIORITY_BATCH
+                )
+                future_to_group[future] = (content_hash, members)
+                vertex_futures.add(future)
+            
+            # 按完成顺序合并结果，进度和最高值都只在当前线程中更新
+            for future in concurrent.futures.as_completed(future_to_group):
+                if cancel_token.cancelled:
+                    # 取消后不再启动排队中的编译，已完成的结果继续合并
+                    for pending in future_to_group:
+                        pending.cancel()
                 
-                # 编译并计算复杂度
-                cmd = f'powershell -Command "& \'{malisc_path}\' \'{frag_file_path}\'"'
-                import subprocess
-                result = subprocess.run(cmd, shell=True, capture_output=True, text=True, encoding='utf-8')
+                content_hash, members = future_to_group[future]
+                try:
+                    entry = future.result()
+                except (concurrent.futures.CancelledError, CompileCancelled):
+                    continue
                 
-                if result.returncode == 0:
-                    output = result.stdout
-                    # 计算Longest Path Cycles总和
-                    cycles_sum = self.calculate_longest_path_cycles_sum(output)
-                    # 提取Instructions Emitted值
-                    instructions = self.extract_instructions_emitted(output)
-                    
-                    # 在frag列表中更新该文件的显示，添加复杂度和指令数信息
-                    if cycles_sum is not None and instructions is not None:
-                        # 格式化复杂度值（如果是整数则不显示小数点）
-                        if cycles_sum.is_integer():
-                            cycles_str = str(int(cycles_sum))
-                        else:
-                            cycles_str = str(cycles_sum)
-                        
-                        display_name = f"{frag_file} : ({cycles_str}-{instructions})"
-                        wx.CallAfter(self.update_frag_list_item, frag_file, display_name)
-                    
-                    if cycles_sum is not None and cycles_sum > max_cycles_sum:
-                        max_cycles_sum = cycles_sum
-                        max_frag_file = frag_file
-                    
-                    if instructions is not None and instructions > max_instructions:
-                        max_instructions = instructions
-
-
+                if entry["from_cache"]:
+                    cache_hits += 1
+                if entry["timed_out"]:
+                    timed_out += 1
+                if future in vertex_futures:
+                    # 顶点程序的结果记录到同编号的frag变体上，不参与热点统计
+                    for vert_file, vert_file_path in members:
+                        completed += 1
+                        frag_file = os.path.splitext(vert_file)[0] + ".frag"
+                        frag_file_path = os.path.splitext(vert_file_path)[0] + ".frag"
+                        vertex_entries[frag_file] = entry
+                        wx.CallAfter(self.record_vertex_metrics, frag_file, frag_file_path, entry)
+                    wx.CallAfter(self.update_progress, completed, total, f"已完成: {members[0][0]}")
+                    continue
+                if entry["returncode"] == 0:
+                    cycles_sum, instructions = entry["cycles_sum"], entry["instructions"]
+                    parsed = MaliscMetrics.from_dict(entry.get("metrics") or {})
+                    bound, pipeline_cycles = parsed.bound_unit, parsed.pipeline_cycles
+                else:
+                    cycles_sum, instructions = None, None
+                    bound, pipeline_cycles = None, None
+                
+                # 将同一份编译结果分发给内容相同的所有变体，frag列表中的对应行随之更新
+                for frag_file, frag_file_path in members:
+                    completed += 1
+                    wx.CallAfter(self.record_frag_metrics, frag_file, frag_file_path, entry)
+                    hot_list.add(frag_file, cycles_sum, instructions, bound, pipeline_cycles)
+                    fragment_results.append((frag_file, content_hash, entry))
+                
+                wx.CallAfter(self.update_progress, completed, total, f"已完成: {members[0][0]}")
+            
             # 关闭进度对话框
             wx.CallAfter(self.close_progress_dialog)
             
+            result_rows = [self.make_result_row(frag_file, content_hash, entry, vertex_entries.get(frag_file),
+                                                variant_keywords.get(frag_file))
+                           for frag_file, content_hash, entry in fragment_results]
+            self.save_results(current_path, "最高复杂度", backend, (), result_rows)
+            
+            worst_cycles = hot_list.worst("cycles_sum")
+            worst_instructions = hot_list.worst("instructions")
+            max_cycles_sum, max_frag_file = worst_cycles if worst_cycles else (0, "")
+            max_instructions = worst_instructions[0] if worst_instructions else 0
+            
             # 在主线程中更新显示
+            wx.CallAfter(self.set_hot_list, hot_list)
             wx.CallAfter(self.update_highest_frag_display, max_cycles_sum, max_instructions, max_frag_file)
             
             # 在主线程中根据最高复杂度值设置颜色
@@ -2426,9 +4774,21 @@ class ShaderBrowser(wx.Frame):
             
             # 在主线程中更新状态栏
             if max_frag_file:
-                wx.CallAfter(self.status_bar.SetStatusText, f"找到最高复杂度变体: {max_frag_file}")
+                deduplicated = total - len(variant_groups) - len(vertex_groups)
+                variant_count = f"{len(frag_files_to_process)} 个变体"
+                if vertex_files:
+                    variant_count += f"、{len(vertex_files)} 个顶点程序"
+                status = (f"找到最高复杂度变体: {max_frag_file}（共 {variant_count}，避免编译 {deduplicated + cache_hits} 次："
+                          f"去重 {deduplicated}，缓存命中 {cache_hits}）")
+                if worst_instructions and worst_instructions[1] != max_frag_file:
+                    status += f"，最高指令数变体: {worst_instructions[1]}"
             else:
-                wx.CallAfter(self.status_bar.SetStatusText, "未找到有效的frag变体")
+                status = "未找到有效的frag变体"
+            if timed_out:
+                status += f"，{timed_out} 个编译超时"
+            if cancel_token.cancelled:
+                status = f"已取消，显示已完成的 {completed}/{total} 个变体结果。" + status
+            wx.CallAfter(self.status_bar.SetStatusText, status)
                 
         except Exception as e:
             # 关闭进度对话框
@@ -2438,27 +4798,443 @@ class ShaderBrowser(wx.Frame):
             wx.CallAfter(self.status_bar.SetStatusText, error_msg)
             wx.CallAfter(wx.MessageBox, error_msg, "错误", wx.OK | wx.ICON_ERROR)
     
-    def update_frag_list_item(self, original_name, display_name):
-        """更新frag列表中指定项的显示名称"""
-        # 查找原始文件名在列表中的位置
-        for i in range(self.frag_list.GetCount()):
-            item_text = self.frag_list.GetString(i)
-            # 检查是否匹配原始文件名（可能已经包含复杂度信息）
-            if item_text == original_name or item_text.startswith(original_name + " :"):
-                self.frag_list.SetString(i, display_name)
-                break
-    
-    def extract_frag_filename(self, display_text):
-        """从显示文本中提取原始文件名，去除复杂度信息
-        例如: 'file_001.frag : (63-150)' -> 'file_001.frag'
+    def collect_batch_variants(self, file_names, current_path, in_memory=False):
+        """收集批量分析所需的变体（在批量任务线程中调用）
+        in_memory 为 False 时缺少变体文件会先分离到Frags目录；为 True 时只在内存中提取
+        返回 (frag_files_to_process, memory_variants, variant_keywords)：
+        frag_files_to_process 为 [(frag文件名, frag路径), ...]，memory_variants 为 {frag文件名: 内容} 或 None，
+        variant_keywords 为 {frag文件名: [关键字, ...]}
         """
-        # 检查是否包含复杂度信息
-        if " : (" in display_text:
-            # 提取冒号前的文件名
-            return display_text.split(" : (")[0]
+        frags_dir = os.path.join(current_path, "Frags")
+        # 内存分析模式下变体内容只保存在内存中：{frag文件名: 内容}
+        memory_variants = None
+        
+        if in_memory:
+            # 只做分析：在内存中提取变体，不写入Frags目录
+            wx.CallAfter(self.status_bar.SetStatusText, "正在提取frag变体（不写入Frags目录）...")
+            memory_variants = {}
+            variant_keywords = {}
+            for file_name in file_names:
+                shader_path = os.path.join(current_path, file_name)
+                if os.path.exists(shader_path):
+                    memory_variants.update(self.extract_fragment_variants(shader_path, variant_keywords))
+            
+            # 在列表中显示内存中的变体
+            wx.CallAfter(self.show_memory_variants, memory_variants, variant_keywords)
+            
+            frag_files_to_process = [(frag_file, os.path.join(frags_dir, frag_file))
+                                     for frag_file in sorted(memory_variants) if frag_file.endswith(".frag")]
         else:
-            # 没有复杂度信息，直接返回
-            return display_text
+            # 按分离清单增量分离：没有变化的shader直接使用上次分离的变体
+            wx.CallAfter(self.status_bar.SetStatusText, "正在检查并分离frag变体...")
+            results = self.separate_shaders(file_names, current_path)
+            # 关键字在分离时记录在清单中（没有变化而跳过的shader沿用上次的记录）
+            variant_keywords = FragManifest(frags_dir).variant_keywords()
+            
+            # 刷新frag列表
+            wx.CallAfter(self.load_frag_files, current_path)
+            
+            # 收集所有需要处理的frag文件
+            frag_files_to_process = [(frag_file, os.path.join(frags_dir, frag_file))
+                                     for _, frag_files, _, _ in results if frag_files
+                                     for frag_file in frag_files if frag_file.endswith(".frag")]
+        
+        return frag_files_to_process, memory_variants, variant_keywords
+    
+    def compile_frag(self, backend, frag_file_path, content_hash=None, cancel_token=None, source=None, args=(),
+                     on_metrics=None):
+        """编译frag文件，返回包含完整输出和解析指标的字典
+        规范化内容相同、编译器和参数相同的结果直接从编译缓存读取，不再启动malisc
+        该方法会在工作线程中调用，不能直接操作界面控件
+        content_hash 为已计算好的规范化内容哈希，为None时读取文件计算
+        source 为内存中的变体内容，提供时通过临时文件池交给编译器，不读取 frag_file_path
+        args 为额外的编译参数（例如 ["-c", "Mali-G78"]），参与缓存键的计算
+        on_metrics 在流式模式下复杂度和指令数解析出来后立即被调用（在工作线程中），参数为 MaliscMetrics
+        编译超时时返回 timed_out 为 True 的结果；任务被取消时抛出 CompileCancelled
+        """
+        if cancel_token is not None and cancel_token.cancelled:
+            raise CompileCancelled(frag_file_path)
+        
+        if content_hash is None:
+            if source is not None:
+                content_hash = self.normalized_source_hash(source)
+            else:
+                with open(frag_file_path, 'rb') as f:
+                    content_hash = self.normalized_source_hash(f.read())
+        
+        key = self.compile_cache.make_key(content_hash, backend.identity_path, args)
+        entry = self.compile_cache.get(key)
+        if entry is not None:
+            if "variant_cycles" not in (entry.get("metrics") or {}):
+                # 旧版本写入的缓存没有结构化指标（或没有按变体拆分的复杂度），按输出重新解析
+                entry["metrics"] = MaliscOutputParser.parse(entry["output"]).to_dict()
+            entry["timed_out"] = False
+            entry["from_cache"] = True
+            return entry
+        
+        # 内存中的变体写入当前工作线程专用的临时文件（文件复用，不产生新文件）
+        if source is not None:
+            frag_file_path = self.temp_source_pool.write(source, os.path.splitext(frag_file_path)[1])
+        
+        # 直接启动编译器进程（不经过PowerShell）
+        try:
+            if self.streaming_output:
+                result, metrics = backend.run_streaming(
+                    frag_file_path, args, timeout=self.compile_timeout, cancel_token=cancel_token,
+                    on_metrics=on_metrics, max_output_chars=self.max_output_chars
+                )
+            else:
+                result = backend.run(frag_file_path, args, timeout=self.compile_timeout, cancel_token=cancel_token)
+                metrics = None
+        except subprocess.TimeoutExpired:
+            return {
+                "output": f"编译超时: 超过 {self.compile_timeout} 秒未完成，已终止编译进程",
+                "returncode": None,
+                "cycles_sum": None,
+                "instructions": None,
+                "metrics": None,
+                "timed_out": True,
+                "from_cache": False,
+            }
+        
+        output = result.stdout
+        if result.returncode != 0:
+            output += f"\n\n错误代码: {result.returncode}"
+            if result.stderr:
+                output += f"\n错误信息: {result.stderr}"
+        
+        # 单遍解析编译输出（流式模式下已在读取时解析），cycles_sum 为Longest Path Cycles总和，instructions 为Instructions Emitted值
+        if metrics is None:
+            metrics = MaliscOutputParser.parse(output)
+        entry = {
+            "output": output,
+            "returncode": result.returncode,
+            "cycles_sum": metrics.cycles_sum,
+            "instructions": metrics.instructions_emitted,
+            "metrics": metrics.to_dict(),
+        }
+        
+        # 只缓存编译成功的结果，避免把偶发失败固化下来
+        if result.returncode == 0:
+            try:
+                self.compile_cache.put(key, entry)
+            except OSError as e:
+                wx.CallAfter(self.status_bar.SetStatusText, f"写入编译缓存失败: {str(e)}")
+        
+        entry["timed_out"] = False
+        entry["from_cache"] = False
+        return entry
+    
+    def group_variants_by_content(self, frag_files, sources=None):
+        """按规范化内容的哈希对变体分组
+        sources 为内存中的变体内容 {frag文件名: 内容}，为None时从文件读取
+        返回 {内容哈希: [(frag文件名, frag路径), ...]}，保持原有顺序
+        """
+        groups = {}
+        for frag_file, frag_file_path in frag_files:
+            if sources is not None:
+                digest = self.normalized_source_hash(sources[frag_file])
+            else:
+                with open(frag_file_path, 'rb') as f:
+                    digest = self.normalized_source_hash(f.read())
+            groups.setdefault(digest, []).append((frag_file, frag_file_path))
+        return groups
+    
+    def normalize_shader_source(self, content):
+        """生成用于哈希的规范化源码：去除注释、#line 指令和多余空白
+        只影响缓存/去重的判定，不会修改实际参与编译的文件
+        注释替换为一个空格（a/**/b 与 ab 是不同的程序），随后与其他空白一起合并。
+        #line 不参与哈希，缓存或去重复用的编译输出中的行号可能来自另一个变体
+        """
+        content = self.remove_comments_from_content(content, ' ')
+        
+        lines = []
+        for line in content.splitlines():
+            # 行首尾空白去掉，行内连续空白合并为一个空格
+            line = ' '.join(line.split())
+            # #line 指令只影响报错行号，不影响编译结果
+            if line.startswith('#line ') or line.startswith('# line '):
+                continue
+            lines.append(line + '\n')
+        
+        return self.compress_empty_lines(''.join(lines))
+    
+    def normalized_source_hash(self, content):
+        """计算规范化源码的SHA-256（content 为 bytes 或 str）"""
+        if isinstance(content, bytes):
+            content = content.decode('utf-8', errors='replace')
+        normalized = self.normalize_shader_source(content)
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+    
+    def get_compile_workers(self):
+        """获取并发编译的线程数：读取配置项 compile_workers，默认使用CPU核心数"""
+        workers = self.load_config().get("compile_workers")
+        if isinstance(workers, int) and workers > 0:
+            return workers
+        return os.cpu_count() or 1
+    
+    def load_config(self):
+        """读取配置文件，文件不存在或解析失败时返回空字典"""
+        try:
+            if os.path.exists(self.CONFIG_FILE):
+                with open(self.CONFIG_FILE, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception:
+            pass
+        return {}
+    
+    def on_core_sweep(self, event):
+        """处理多核扫描按钮点击事件：针对多个核心编译选中shader的所有变体"""
+        selections = self.file_list.GetSelections()
+        if not selections:
+            wx.MessageBox("请先在左侧列表中选择一个或多个.shader文件", "提示", wx.OK | wx.ICON_WARNING)
+            return
+        
+        current_path = self.path_combo.GetValue()
+        if not current_path:
+            wx.MessageBox("请先选择或输入路径", "提示", wx.OK | wx.ICON_WARNING)
+            return
+        
+        file_names = [self.file_list.GetString(selection) for selection in selections]
+        
+        # 输入要扫描的核心列表（记录在配置项 sweep_cores 中）
+        config = self.load_config()
+        default_cores = config.get("sweep_cores", "Mali-G71,Mali-G76,Mali-G78")
+        dlg = wx.TextEntryDialog(
+            self,
+            f"将对 {len(file_names)} 个shader的所有变体按以下核心分别编译（逗号分隔，对应malisc的 -c 参数）:",
+            "多核扫描",
+            value=default_cores
+        )
+        
+        if dlg.ShowModal() != wx.ID_OK:
+            dlg.Destroy()
+            self.status_bar.SetStatusText("用户取消操作")
+            return
+        
+        cores_text = dlg.GetValue()
+        dlg.Destroy()
+        
+        cores = [core.strip() for core in cores_text.split(',') if core.strip()]
+        if not cores:
+            wx.MessageBox("请至少输入一个核心名称", "提示", wx.OK | wx.ICON_WARNING)
+            return
+        
+        try:
+            config["sweep_cores"] = ",".join(cores)
+            with open(self.CONFIG_FILE, 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            self.status_bar.SetStatusText(f"保存核心列表失败: {str(e)}")
+        
+        # 前台批量任务开始，停止后台预编译
+        self.cancel_prefetch()
+        
+        thread = threading.Thread(
+            target=self.core_sweep_in_thread,
+            args=(file_names, current_path, cores, self.memory_checkbox.GetValue())
+        )
+        thread.daemon = True
+        thread.start()
+    
+    def core_sweep_in_thread(self, file_names, current_path, cores, in_memory=False):
+        """在新线程中执行 核心 × 变体 的矩阵编译，汇总每个核心的最坏情况"""
+        try:
+            wx.CallAfter(self.status_bar.SetStatusText, f"正在进行多核扫描（{len(cores)} 个核心）...")
+            
+            backend = self.get_compiler_backend()
+            if not backend:
+                wx.CallAfter(self.status_bar.SetStatusText, "未找到malisc.exe")
+                wx.CallAfter(wx.MessageBox,
+                    "未找到 malisc.exe\n请确保 Mali_Offline_Compiler_Windows 目录存在且包含 malisc.exe",
+                    "错误", wx.OK | wx.ICON_ERROR)
+                return
+            
+            frag_files_to_process, memory_variants, variant_keywords = self.collect_batch_variants(
+                file_names, current_path, in_memory)
+            if not frag_files_to_process:
+                wx.CallAfter(self.status_bar.SetStatusText, "未找到对应的frag变体文件")
+                return
+            
+            variant_groups = self.group_variants_by_content(frag_files_to_process, memory_variants)
+            total = len(cores) * len(frag_files_to_process)
+            
+            cancel_token = CompileCancelToken()
+            wx.CallAfter(self.show_progress_dialog, total, cancel_token.cancel, "多核扫描")
+            
+            # 每个核心的汇总：最高复杂度及变体、最高指令数及变体、成功/失败数量
+            summaries = {
+                core: {"max_cycles": 0, "max_cycles_frag": "", "max_instructions": 0,
+                       "max_instructions_frag": "", "ok": 0, "failed": 0}
+                for core in cores
+            }
+            
+            # 每个核心的结果作为一次单独的分析写入结果数据库
+            core_rows = {core: [] for core in cores}
+            
+            # 所有 核心 × 唯一变体 的组合一次性提交，由调度器并发执行；每个组合单独缓存
+            future_to_cell = {}
+            for core in cores:
+                for content_hash, members in variant_groups.items():
+                    frag_file, frag_file_path = members[0]
+                    source = memory_variants.get(frag_file) if memory_variants is not None else None
+                    future = self.compile_scheduler.submit(
+                        self.compile_frag, backend, frag_file_path, content_hash, cancel_token, source, ("-c", core),
+                        priority=CompileScheduler.PRIORITY_BATCH
+                    )
+                    future_to_cell[future] = (core, content_hash, members)
+            
+            completed = 0
+            for future in concurrent.futures.as_completed(future_to_cell):
+                if cancel_token.cancelled:
+                    for pending in future_to_cell:
+                        pending.cancel()
+                
+                core, content_hash, members = future_to_cell[future]
+                try:
+                    entry = future.result()
+                except (concurrent.futures.CancelledError, CompileCancelled):
+                    continue
+                
+                summary = summaries[core]
+                completed += len(members)
+                core_rows[core].extend(self.make_result_row(frag_file, content_hash, entry, None,
+                                                            variant_keywords.get(frag_file))
+                                       for frag_file, _ in members)
+                if entry["returncode"] != 0 or entry["cycles_sum"] is None:
+                    summary["failed"] += len(members)
+                else:
+                    summary["ok"] += len(members)
+                    frag_file = members[0][0]
+                    if entry["cycles_sum"] > summary["max_cycles"]:
+                        summary["max_cycles"] = entry["cycles_sum"]
+                        summary["max_cycles_frag"] = frag_file
+                    instructions = entry["instructions"]
+                    if instructions is not None and instructions > summary["max_instructions"]:
+                        summary["max_instructions"] = instructions
+                        summary["max_instructions_frag"] = frag_file
+                
+                wx.CallAfter(self.update_progress, completed, total, f"[{core}] 已完成: {members[0][0]}")
+            
+            wx.CallAfter(self.close_progress_dialog)
+            for core in cores:
+                self.save_results(current_path, "多核扫描", backend, ("-c", core), core_rows[core])
+            wx.CallAfter(self.show_core_sweep_result, cores, summaries)
+            
+            status = f"多核扫描完成: {len(cores)} 个核心 × {len(frag_files_to_process)} 个变体"
+            if cancel_token.cancelled:
+                status = f"多核扫描已取消，显示已完成的 {completed}/{total} 个结果"
+            wx.CallAfter(self.status_bar.SetStatusText, status)
+        
+        except Exception as e:
+            wx.CallAfter(self.close_progress_dialog)
+            error_msg = f"多核扫描失败: {str(e)}"
+            wx.CallAfter(self.status_bar.SetStatusText, error_msg)
+            wx.CallAfter(wx.MessageBox, error_msg, "错误", wx.OK | wx.ICON_ERROR)
+    
+    def make_result_row(self, frag_file, content_hash, entry, vertex_entry=None, keywords=None):
+        """生成写入结果数据库的一行（列顺序见 ResultsDatabase.RESULT_COLUMNS）
+        vertex_entry 为配对的顶点程序的编译结果（没有时为 None），keywords 为变体的关键字（未记录时为 None）
+        """
+        vertex_ok = vertex_entry is not None and vertex_entry["returncode"] == 0
+        # 顶点复杂度为整个顶点阶段的复杂度（IDVS 为 Position 与 Varying 之和）
+        vertex_cycles_sum = (MaliscMetrics.from_dict(vertex_entry.get("metrics") or {}).stage_cycles_sum
+                             if vertex_ok else None)
+        metrics = MaliscMetrics.from_dict(entry.get("metrics") or {})
+        pipeline_cycles = metrics.pipeline_cycles
+        return (
+            HotListTracker.shader_name_of(frag_file),
+            frag_file,
+            content_hash,
+            metrics.compiler_version,
+            time.time(),
+            entry["cycles_sum"],
+            entry["instructions"],
+            metrics.work_registers,
+            metrics.uniform_registers,
+            metrics.bound_unit,
+            None if metrics.spilling is None else int(metrics.spilling),
+            entry["returncode"],
+            json.dumps(pipeline_cycles) if pipeline_cycles else None,
+            vertex_cycles_sum,
+            vertex_entry["instructions"] if vertex_ok else None,
+            None if keywords is None else " ".join(keywords),
+        )
+    
+    def save_results(self, project, kind, backend, args, rows):
+        """把一次分析的结果写入结果数据库（在批量任务线程中调用），失败时只在状态栏提示"""
+        if self.results_db is None or not rows:
+            return
+        try:
+            run_id = self.results_db.begin_run(os.path.abspath(project), kind, backend.name, args)
+            # 带额外参数（例如多核扫描的 -c）的结果不作为变体的最新结果
+            self.results_db.add_results(run_id, os.path.abspath(project), rows, latest=not args)
+        except sqlite3.Error as e:
+            wx.CallAfter(self.status_bar.SetStatusText, f"保存分析结果失败: {str(e)}")
+    
+    def on_results_db(self, event):
+        """处理结果库按钮点击事件：打开结果查询对话框"""
+        if self.results_db is None:
+            wx.MessageBox("结果数据库不可用", "错误", wx.OK | wx.ICON_ERROR)
+            return
+        dlg = ResultsQueryDialog(self, self.results_db)
+        dlg.Show()
+    
+    def set_hot_list(self, hot_list):
+        """保存最近一次批量分析的热点统计（在主线程中调用）"""
+        self.hot_list = hot_list
+    
+    def on_hot_list(self, event):
+        """处理热点列表按钮点击事件：显示最近一次批量分析的热点列表"""
+        if self.hot_list is None:
+            wx.MessageBox("请先对选中的shader执行\"最高复杂度\"查找", "提示", wx.OK | wx.ICON_INFORMATION)
+            return
+        dlg = HotListDialog(self, self.hot_list)
+        dlg.Show()
+    
+    def show_core_sweep_result(self, cores, summaries):
+        """显示多核扫描结果对话框（非模态）"""
+        dlg = CoreSweepResultDialog(self, cores, summaries)
+        dlg.Show()
+    
+    def set_frag_rows(self, directory, frag_files):
+        """用指定的变体文件名重建frag列表，行与指标存储中的记录一一对应
+        重新加载时清空旧的指标（变体文件可能已被重新分离）
+        """
+        frags_dir = os.path.join(directory, "Frags") if directory else "Frags"
+        self.metric_store.clear()
+        records = []
+        for frag_file in frag_files:
+            record = self.metric_store.get_or_create(frag_file, os.path.join(frags_dir, frag_file))
+            record.keywords = tuple(self.variant_keywords.get(frag_file, ()))
+            records.append(record)
+        self.frag_list.set_records(records)
+    
+    def record_frag_metrics(self, frag_file_name, frag_file_path, entry):
+        """记录编译结果并刷新frag列表中对应的行（在主线程中调用）"""
+        record = self.metric_store.get_or_create(frag_file_name, frag_file_path)
+        if record.update_from_entry(entry):
+            self.frag_list.refresh_record(frag_file_path)
+    
+    def record_vertex_metrics(self, frag_file_name, frag_file_path, entry):
+        """把顶点程序的编译结果记录到配对的frag变体上并刷新对应的行（在主线程中调用）"""
+        record = self.metric_store.get_or_create(frag_file_name, frag_file_path)
+        if record.update_vertex_from_entry(entry):
+            self.frag_list.refresh_record(frag_file_path)
+    
+    @staticmethod
+    def paired_vertex_files(frag_files, sources=None):
+        """返回与frag变体配对（同名 .vert 存在）的顶点程序 [(vert文件名, vert路径), ...]
+        sources 为内存中的变体内容 {文件名: 内容}，为None时检查文件是否存在
+        """
+        vertex_files = []
+        for frag_file, frag_file_path in frag_files:
+            vert_file = os.path.splitext(frag_file)[0] + ".vert"
+            vert_file_path = os.path.splitext(frag_file_path)[0] + ".vert"
+            exists = vert_file in sources if sources is not None else os.path.exists(vert_file_path)
+            if exists:
+                vertex_files.append((vert_file, vert_file_path))
+        return vertex_files
     
     def update_highest_frag_display(self, max_cycles_sum, max_instructions, max_frag_file):
         """更新最高复杂度显示"""
@@ -2488,7 +5264,7 @@ class ShaderBrowser(wx.Frame):
             self.frag_name_label.SetLabel("")
 
     def on_delete_frag(self, event):
-        """处理清除变体按钮点击事件：删除Frags目录中的所有.frag文件"""
+        """处理清除变体按钮点击事件：删除Frags目录中的所有变体文件（.frag 和配对的 .vert）以及分离清单"""
         current_path = self.path_combo.GetValue()
         if not current_path:
             wx.MessageBox("请先选择或输入路径", "提示", wx.OK | wx.ICON_WARNING)
@@ -2504,7 +5280,7 @@ class ShaderBrowser(wx.Frame):
         # 确认对话框
         dlg = wx.MessageDialog(
             self,
-            f"确定要删除Frags目录中的所有.frag文件吗？\n\n目录: {frags_dir}\n\n此操作不可撤销！",
+            f"确定要删除Frags目录中的所有变体文件（.frag 和 .vert）吗？\n\n目录: {frags_dir}\n\n此操作不可撤销！",
             "确认删除操作",
             wx.YES_NO | wx.NO_DEFAULT | wx.ICON_WARNING
         )
@@ -2516,6 +5292,9 @@ class ShaderBrowser(wx.Frame):
         
         dlg.Destroy()
         
+        # 删除变体前停止后台预编译
+        self.cancel_prefetch()
+        
         try:
             # 统计删除的文件数量
             deleted_count = 0
@@ -2525,7 +5304,7 @@ class ShaderBrowser(wx.Frame):
             # 遍历Frags目录及其子目录
             for root, dirs, files in os.walk(frags_dir):
                 for file in files:
-                    if file.lower().endswith('.frag'):
+                    if file.lower().endswith(('.frag', '.vert')):
                         file_path = os.path.join(root, file)
                         try:
                             os.remove(file_path)
@@ -2534,8 +5313,11 @@ class ShaderBrowser(wx.Frame):
                             error_count += 1
                             error_messages.append(f"{file}: {str(e)}")
             
+            # 清单与它描述的变体文件一起清除，否则会继续提供已删除变体的记录
+            FragManifest(frags_dir).clear()
+            
             # 显示结果
-            result_message = f"删除完成！\n成功删除: {deleted_count} 个.frag文件"
+            result_message = f"删除完成！\n成功删除: {deleted_count} 个变体文件"
             
             # if error_count > 0:
             #     result_message += f"\n失败: {error_count} 个文件"
@@ -2547,7 +5329,7 @@ class ShaderBrowser(wx.Frame):
             # wx.MessageBox(result_message, "删除结果", wx.OK | wx.ICON_INFORMATION)
             
             # 更新状态栏
-            self.status_bar.SetStatusText(f"已删除 {deleted_count} 个.frag文件")
+            self.status_bar.SetStatusText(f"已删除 {deleted_count} 个变体文件（.frag/.vert）")
             
             # 刷新frag列表
             self.load_frag_files(current_path)
@@ -2567,9 +5349,10 @@ class ShaderBrowser(wx.Frame):
             self.status_bar.SetStatusText(error_msg)
             wx.MessageBox(error_msg, "错误", wx.OK | wx.ICON_ERROR)
     
-    def show_progress_dialog(self, total_items):
-        """显示进度对话框"""
-        self.progress_dialog = ProgressDialog(self, title="查找最高复杂度", message="正在处理frag文件...")
+    def show_progress_dialog(self, total_items, on_cancel=None, title="查找最高复杂度"):
+        """显示进度对话框（on_cancel 不为空时可取消）"""
+        self.progress_dialog = ProgressDialog(self, title=title, message="正在处理frag文件...",
+                                              on_cancel=on_cancel)
         self.progress_dialog.Show()
         self.progress_dialog.update_progress(0, total_items)
     
@@ -2637,12 +5420,17 @@ class ShaderBrowser(wx.Frame):
             
             # 无论是否找到.shader文件，都尝试加载frag文件
             self.load_frag_files(directory)
+            
+            # 列表刷新后重新安排后台预编译
+            self.start_prefetch()
                 
         except Exception as e:
             self.status_bar.SetStatusText(f"错误: {str(e)}")
 
 
 def main():
+    # 打包后的程序中，进程池（分离frag）启动的子进程在这里执行任务后退出
+    multiprocessing.freeze_support()
     app = wx.App(False)
     frame = ShaderBrowser(None, "Shader frag 分离器(YD)")  #创建应用程序的主窗口实例
     # 显示启动消息